@@ -0,0 +1,20 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("arranque")
+
+# (fase, segundos) en el orden en que terminaron, para el registro y para wsgi.py
+FASES = []
+
+
+@contextmanager
+def fase(nombre: str):
+    """Mide una fase del arranque (imports pesados, carga de datos) y la registra en el log."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        FASES.append((nombre, segundos))
+        logger.info("Arranque: %s en %.3f s", nombre, segundos)
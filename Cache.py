@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_regiones(regiones) -> tuple:
+    """Misma selección de regiones, mismo orden: ['B', 'A', 'A'] y ['A', 'B'] dan ('A', 'B')."""
+    return tuple(sorted(frozenset(regiones or [])))
+
+
+def serializar(valores) -> bytes:
+    """Serializa figuras y componentes de Dash (usan `to_plotly_json`) a JSON."""
+    return to_json_plotly(valores).encode("utf-8")
+
+
+def deserializar(datos: bytes):
+    return json.loads(datos)
+
+
+class CacheFiguras:
+    """
+    Caché LRU de resultados serializados, acotada en bytes (del JSON serializado).
+
+    En memoria se guarda el JSON junto con su versión ya deserializada, así un acierto en el
+    mismo proceso no vuelve a parsear nada.
+
+    La clave combina la selección de regiones normalizada, la versión del dataset y cualquier
+    otro parámetro que cambie el resultado. Si se indica `directorio`, los resultados también
+    se guardan ahí (un archivo por clave) para que todos los workers de gunicorn compartan los
+    aciertos; en Linux `/dev/shm/...` lo deja en memoria compartida.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directorio: str = None, max_archivos: int = 512):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self.max_archivos = max_archivos
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    @staticmethod
+    def clave(regiones, version: str, *extra) -> str:
+        texto = json.dumps([normalizar_regiones(regiones), version, *extra], default=str)
+        return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json")
+
+    def obtener(self, clave: str):
+        """Devuelve el resultado deserializado o None si no está en ninguna capa."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                return entrada[1]
+
+        if not self.directorio:
+            return None
+        try:
+            with open(self._ruta(clave), "rb") as f:
+                datos = f.read()
+            # Tocamos el archivo para que la poda por antigüedad se comporte como LRU
+            os.utime(self._ruta(clave))
+        except OSError:
+            return None
+        valores = deserializar(datos)
+        self._guardar_memoria(clave, datos, valores)
+        return valores
+
+    def guardar(self, clave: str, valores):
+        """Serializa `valores` y los guarda; devuelve la versión deserializada para responder."""
+        datos = serializar(valores)
+        valores = deserializar(datos)
+        self._guardar_memoria(clave, datos, valores)
+        if self.directorio:
+            self._guardar_disco(clave, datos)
+        return valores
+
+    def _guardar_memoria(self, clave, datos, valores):
+        if len(datos) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[0])
+            self._entradas[clave] = (datos, valores)
+            self._bytes += len(datos)
+            # Expulsamos los menos usados hasta volver al límite
+            while self._bytes > self.max_bytes:
+                _, (expulsado, _) = self._entradas.popitem(last=False)
+                self._bytes -= len(expulsado)
+
+    def _guardar_disco(self, clave, datos):
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+            self._podar_disco()
+        except OSError:
+            logger.warning("Error al guardar en la caché de disco %s", ruta, exc_info=True)
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+
+    def _podar_disco(self):
+        archivos = [os.path.join(self.directorio, n) for n in os.listdir(self.directorio) if n.endswith(".json")]
+        if len(archivos) <= self.max_archivos:
+            return
+        archivos.sort(key=lambda ruta: os.stat(ruta).st_mtime)
+        for ruta in archivos[:len(archivos) - self.max_archivos]:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import time
+
+from Conexion import obtener_conexion
+
+logger = logging.getLogger(__name__)
+
+# Segundos que un catálogo se considera vigente y mínimo entre recargas provocadas por fallos
+TTL = float(os.getenv("CATALOGOS_TTL", "600"))
+MIN_RECARGA = float(os.getenv("CATALOGOS_MIN_RECARGA", "5"))
+
+
+class CatalogoIds:
+    """
+    Mapa nombre → id de una tabla de catálogo, cacheado en el proceso.
+
+    Se carga con un solo SELECT al arrancar (`cargar_catalogos`) o, si entonces no se pudo,
+    en el primer uso, y se recarga cuando vence el TTL. Si se pide un nombre que no está y
+    `recargar_en_fallo` está activo, se recarga antes de responder (como mucho una vez cada
+    `min_recarga` segundos, para que un nombre inexistente no consulte la tabla en cada
+    petición).
+    """
+
+    def __init__(self, consulta: str, ttl: float = TTL, min_recarga: float = MIN_RECARGA,
+                 recargar_en_fallo: bool = True):
+        self.consulta = consulta
+        self.ttl = ttl
+        self.min_recarga = min_recarga
+        self.recargar_en_fallo = recargar_en_fallo
+        self._ids = {}
+        self._cargado = float("-inf")
+        self._lock = threading.Lock()
+
+    def _recargar(self, cursor):
+        cursor.execute(self.consulta)
+        ids = dict(cursor.fetchall())
+        with self._lock:
+            self._ids = ids
+            self._cargado = time.monotonic()
+
+    def ids(self, cursor, nombres) -> dict:
+        """Ids de los nombres dados; los que no existen en la tabla se omiten."""
+        nombres = list(dict.fromkeys(nombres or []))
+        edad = time.monotonic() - self._cargado
+        faltan = any(nombre not in self._ids for nombre in nombres)
+        if edad > self.ttl or (faltan and self.recargar_en_fallo and edad > self.min_recarga):
+            self._recargar(cursor)
+        ids = self._ids
+        return {nombre: ids[nombre] for nombre in nombres if nombre in ids}
+
+    def id(self, cursor, nombre):
+        return self.ids(cursor, [nombre]).get(nombre)
+
+    def agregar(self, nombre, id_):
+        """Registra un id recién insertado (solo después de confirmar la transacción)."""
+        with self._lock:
+            self._ids = {**self._ids, nombre: id_}
+
+    def invalidar(self):
+        with self._lock:
+            self._cargado = float("-inf")
+
+
+TIPOS_PETICION = CatalogoIds("SELECT nombre_peticion, id_tipo_peticion FROM Tipo_peticion")
+SITIOS = CatalogoIds("SELECT nombre_sitio, id FROM Sitios")
+IPS = CatalogoIds("SELECT nombre_ip, id_ip FROM IP")
+# Los usuarios nuevos se insertan con un upsert y se agregan al catálogo; no hace falta recargar
+USUARIOS = CatalogoIds(
+    """
+    SELECT uu.nombre_usuarios_unicos, u.id_usuarios
+    FROM Usuarios u
+    JOIN Usuarios_unicos uu ON u.id_usuarios_unicos = uu.id_usuarios_unicos
+    """,
+    recargar_en_fallo=False,
+)
+
+
+CATALOGOS = (TIPOS_PETICION, SITIOS, IPS, USUARIOS)
+
+
+def cargar_catalogos() -> bool:
+    """
+    Carga todos los catálogos con una sola conexión. wsgi.py la llama antes de que gunicorn
+    --preload cree los workers, así cada worker hereda los mapas ya cargados. Si MySQL no
+    responde se cargan en el primer uso.
+    """
+    try:
+        with obtener_conexion() as conn:
+            cursor = conn.cursor()
+            for catalogo in CATALOGOS:
+                catalogo._recargar(cursor)
+            cursor.close()
+    except Exception:
+        logger.warning("No se pudieron cargar los catálogos al arrancar; se cargarán en el primer uso",
+                       exc_info=True)
+        return False
+    return True
+
+
+def invalidar_catalogos():
+    """Fuerza la recarga de todos los catálogos en el siguiente uso (p. ej. tras editar las tablas)."""
+    for catalogo in CATALOGOS:
+        catalogo.invalidar()
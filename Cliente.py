@@ -0,0 +1,95 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+from Cubo import CuboConsumo
+from Sketches import SketchesClientes
+
+# Precisión de los sketches que viajan al navegador (4096 registros, ~1.6% de error)
+PRECISION_CLIENTE = 12
+
+
+def _b64(arreglo: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(arreglo).tobytes()).decode("ascii")
+
+
+def _sketch_disperso(sketch, precision):
+    # Solo los registros no vacíos: índices uint16 y rangos uint8 en base64
+    registros = sketch.reducir(precision).registros
+    indices = np.flatnonzero(registros)
+    return {"i": _b64(indices.astype("<u2")), "r": _b64(registros[indices])}
+
+
+def _celdas(cubo, dimension, region, valor, posiciones):
+    # Pares [posición en el catálogo, valor] de una región para una dimensión del cubo
+    tabla = cubo.proyecciones[dimension].loc[[region]]
+    codigos = tabla[dimension].map(posiciones[dimension]).to_numpy()
+    return [[int(c), int(v)] for c, v in zip(codigos, tabla[valor].to_numpy())]
+
+
+def construir_datos_cliente(cubo: CuboConsumo, sketches: SketchesClientes,
+                            precision: int = PRECISION_CLIENTE) -> dict:
+    """
+    Datos compactos por región para el modo de filtrado en el navegador (`dcc.Store`).
+
+    Cada dimensión se envía una sola vez como catálogo y las regiones guardan pares
+    [posición en el catálogo, valor]. Los KPIs de clientes viajan como sketches dispersos y
+    la recurrencia como histograma de vistas por cliente. Los clientes presentes en varias
+    regiones se envían aparte con sus vistas y dispositivos para que el navegador los combine
+    de forma exacta, igual que hace `SketchesClientes`.
+    """
+    catalogos = {
+        dimension: list(cubo.proyecciones[dimension][dimension].drop_duplicates().sort_values())
+        for dimension in ["GENRE", "DEVICE", "DATE", "TITLE"]
+    }
+    posiciones = {dimension: {v: i for i, v in enumerate(valores)} for dimension, valores in catalogos.items()}
+    catalogos["DATE"] = [pd.Timestamp(fecha).strftime("%Y-%m-%d") for fecha in catalogos["DATE"]]
+    for dimension in ["GENRE", "DEVICE", "TITLE"]:
+        catalogos[dimension] = [str(v) for v in catalogos[dimension]]
+
+    itinerantes = sketches.itinerantes
+    ids_itinerantes = set(itinerantes["CUSTOMER_ID"])
+
+    # Posiciones de dispositivo en el catálogo, no una máscara de bits: en JavaScript los
+    # operadores de bits trabajan con 32 bits y no admitirían más de 31 dispositivos
+    posicion_dispositivo = {d: i for i, d in enumerate(catalogos["DEVICE"])}
+    dispositivos = (
+        itinerantes.assign(POSICION=itinerantes["DEVICE"].astype(str).map(posicion_dispositivo))
+        .groupby(["REGION", "CUSTOMER_ID"], observed=True)["POSICION"]
+        .agg(lambda posiciones: sorted(set(posiciones)))
+    )
+    vistas_itinerantes = cubo.vistas_itinerantes.set_index(["REGION", "CUSTOMER_ID"])["VISTAS"]
+    codigo_cliente = {c: i for i, c in enumerate(sorted(ids_itinerantes, key=str))}
+
+    por_region = {}
+    for region in cubo.regiones:
+        histograma = cubo.recurrencia_local.loc[[region]] if region in cubo.recurrencia_local.index else None
+        clave = str(region)
+        por_region[clave] = {
+            "GENRE": _celdas(cubo, "GENRE", region, "SCREENTIME", posiciones),
+            "DEVICE": _celdas(cubo, "DEVICE", region, "VISTAS", posiciones),
+            "DATE": _celdas(cubo, "DATE", region, "SCREENTIME", posiciones),
+            "TITLE": _celdas(cubo, "TITLE", region, "SCREENTIME", posiciones),
+            "SCREENTIME": int(cubo.proyecciones["REGION"].loc[region, "SCREENTIME"]),
+            "recurrencia": ([] if histograma is None else
+                            [[int(v), int(n)] for v, n in zip(histograma["VISTAS"], histograma["CLIENTES"])]),
+            "clientes": _sketch_disperso(sketches.clientes[region], precision),
+        }
+        if region in sketches.multi_dispositivo:
+            por_region[clave]["multi"] = _sketch_disperso(sketches.multi_dispositivo[region], precision)
+
+    return {
+        # La plantilla de Plotly viaja una vez para que las figuras se vean igual que en el servidor
+        "plantilla": pio.templates[pio.templates.default].layout.to_plotly_json(),
+        "precision": precision,
+        "regiones": [str(r) for r in cubo.regiones],
+        "catalogos": catalogos,
+        "por_region": por_region,
+        # [región, cliente, vistas, [dispositivos]] de los clientes en varias regiones
+        "itinerantes": [
+            [str(region), codigo_cliente[cliente], int(v), [int(d) for d in dispositivos.loc[(region, cliente)]]]
+            for (region, cliente), v in vistas_itinerantes.items()
+        ],
+    }
@@ -0,0 +1,342 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sortedcontainers import SortedList
+
+from Conexion import obtener_conexion
+
+# Filas por página de la tabla de espera
+TAMANO_PAGINA = int(os.getenv("TAMANO_PAGINA_ESPERA", "25"))
+
+# Columnas de la tabla de espera; solo estas se aceptan para ordenar y filtrar
+COLUMNAS_ESPERA = ["usuario", "tipo_peticion", "fecha_petición", "Descripción", "estado_petición",
+                   "sitios", "verticales", "ips"]
+
+# Una fila por petición: sitios, verticales e IPs se agregan en lugar de repetir la petición
+# sitios × IPs veces. Todo va con LEFT JOIN para que una petición sin sitios o IPs también
+# cuente: el total debe coincidir con el de IndiceCola, que lee solo Peticion
+CONSULTA_ESPERA = """
+    SELECT
+        uu.nombre_usuarios_unicos AS usuario,
+        tp.nombre_peticion AS tipo_peticion,
+        p.fecha_petición,
+        p.Descripción,
+        p.estado_petición,
+        GROUP_CONCAT(DISTINCT s.nombre_sitio ORDER BY s.nombre_sitio SEPARATOR ', ') AS sitios,
+        GROUP_CONCAT(DISTINCT v.nombre_vertical ORDER BY v.nombre_vertical SEPARATOR ', ') AS verticales,
+        GROUP_CONCAT(DISTINCT ip.nombre_ip ORDER BY ip.nombre_ip SEPARATOR ', ') AS ips
+    FROM Peticion p
+    LEFT JOIN Usuarios u ON p.id_usuarios = u.id_usuarios
+    LEFT JOIN Usuarios_unicos uu ON u.id_usuarios_unicos = uu.id_usuarios_unicos
+    LEFT JOIN Tipo_peticion tp ON p.id_tipo_peticion = tp.id_tipo_peticion
+    LEFT JOIN Peticion_Sitios ps ON p.id_peticion = ps.id_peticion
+    LEFT JOIN Sitios s ON ps.id_sitios = s.id
+    LEFT JOIN Verticales v ON s.id_vertical = v.id
+    LEFT JOIN Peticion_IP pip ON p.id_peticion = pip.id_peticion
+    LEFT JOIN IP ip ON pip.id_ip = ip.id_ip
+    WHERE p.estado_petición IS NULL OR p.estado_petición != 'Finalizada'
+    GROUP BY p.id_peticion, uu.nombre_usuarios_unicos, tp.nombre_peticion,
+             p.fecha_petición, p.Descripción, p.estado_petición
+"""
+
+# Operadores del filter_query de DataTable y su equivalente en SQL
+OPERADORES_FILTRO = {
+    "=": "=", "eq": "=", "!=": "!=", "ne": "!=",
+    "<": "<", "lt": "<", "<=": "<=", "le": "<=",
+    ">": ">", "gt": ">", ">=": ">=", "ge": ">=",
+    "contains": "LIKE", "datestartswith": "LIKE",
+}
+_PARTE_FILTRO = re.compile(r"^\{(?P<columna>[^}]+)\}\s+(?P<operador>\S+)\s+(?P<valor>.+)$")
+
+
+def _escapar_like(valor):
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filtro_sql(filter_query):
+    """
+    Traduce el `filter_query` de un DataTable a una cláusula WHERE con parámetros.
+
+    Solo se aceptan columnas de `COLUMNAS_ESPERA` y operadores de `OPERADORES_FILTRO` (con o
+    sin el prefijo s/i de sensibilidad a mayúsculas); lo demás se ignora.
+    """
+    condiciones, parametros = [], []
+    for parte in (filter_query or "").split(" && "):
+        coincidencia = _PARTE_FILTRO.match(parte.strip())
+        if not coincidencia:
+            continue
+        columna, operador, valor = coincidencia.group("columna", "operador", "valor")
+        if operador not in OPERADORES_FILTRO and operador[:1] in ("s", "i"):
+            operador = operador[1:]
+        if columna not in COLUMNAS_ESPERA or operador not in OPERADORES_FILTRO:
+            continue
+        valor = valor.strip()
+        if len(valor) >= 2 and valor[0] == valor[-1] and valor[0] in "\"'`":
+            valor = valor[1:-1].replace("\\" + valor[0], valor[0])
+        if operador == "contains":
+            valor = f"%{_escapar_like(valor)}%"
+        elif operador == "datestartswith":
+            valor = f"{_escapar_like(valor)}%"
+        condiciones.append(f"`{columna}` {OPERADORES_FILTRO[operador]} %s")
+        parametros.append(valor)
+    return (" WHERE " + " AND ".join(condiciones) if condiciones else ""), parametros
+
+
+def orden_sql(sort_by):
+    """ORDER BY a partir del `sort_by` de un DataTable; por defecto las más recientes primero."""
+    partes = [
+        f"`{orden['column_id']}` {'DESC' if orden.get('direction') == 'desc' else 'ASC'}"
+        for orden in sort_by or [] if orden.get("column_id") in COLUMNAS_ESPERA
+    ]
+    return ", ".join(partes) or "`fecha_petición` DESC"
+
+
+# Segundos que una foto de la cola se reutiliza sin volver a consultar MySQL
+TTL = float(os.getenv("COLA_TTL", "5"))
+# Archivo cuyo mtime marca la versión de la cola; se toca al insertar una petición para que
+# todos los workers descarten sus fotos
+RUTA_MARCA = os.getenv("COLA_MARCA", "DATA/cola.version")
+
+
+class SnapshotCola:
+    """
+    Fotos breves de la cola de peticiones pendientes: una página de la tabla y el total.
+
+    Cada foto sale de una sola consulta (el total viaja en cada fila con `COUNT(*) OVER()`),
+    así que la tabla y el contador no pueden contradecirse. Las fotos se reutilizan durante
+    `ttl` segundos y, si varios usuarios piden la misma página a la vez, solo uno consulta y
+    los demás esperan su resultado. `invalidar` descarta las fotos de todos los procesos.
+    """
+
+    def __init__(self, ttl: float = TTL, ruta_marca: str = RUTA_MARCA, max_entradas: int = 256):
+        self.ttl = ttl
+        self.ruta_marca = ruta_marca
+        self.max_entradas = max_entradas
+        self._entradas = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _version(self):
+        try:
+            return os.stat(self.ruta_marca).st_mtime_ns
+        except OSError:
+            return 0
+
+    def invalidar(self):
+        """
+        Marca la cola como cambiada (p. ej. después de insertar una petición). Devuelve las
+        versiones anterior y nueva de la marca.
+        """
+        anterior = self._version()
+        directorio = os.path.dirname(self.ruta_marca)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with open(self.ruta_marca, "a"):
+            pass
+        ahora = time.time_ns()
+        os.utime(self.ruta_marca, ns=(ahora, ahora))
+        with self._lock:
+            # Las claves vienen del filtro y el orden que manda el cliente: sin vaciar también los
+            # locks, el diccionario crecería con cada consulta distinta entre desalojos
+            self._entradas.clear()
+            self._locks.clear()
+        return anterior, ahora
+
+    def _consultar(self, pagina, tamano, sort_by, filter_query):
+        where, parametros = filtro_sql(filter_query)
+        query = (f"SELECT t.*, COUNT(*) OVER() AS total_filas FROM ({CONSULTA_ESPERA}) t{where} "
+                 f"ORDER BY {orden_sql(sort_by)} LIMIT %s OFFSET %s")
+        with obtener_conexion() as conn:
+            df = pd.read_sql(query, conn, params=[*parametros, tamano, pagina * tamano])
+            if not df.empty:
+                total = int(df.pop("total_filas").iloc[0])
+            elif pagina == 0:
+                total = 0
+            else:
+                # Página más allá del final: el total no viaja en ninguna fila
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT COUNT(*) FROM ({CONSULTA_ESPERA}) t{where}", parametros)
+                total = cursor.fetchone()[0]
+                cursor.close()
+        df = df.drop(columns="total_filas", errors="ignore")
+        for columna in df.select_dtypes("datetime").columns:
+            df[columna] = df[columna].dt.strftime('%Y-%m-%d %H:%M:%S')
+        return df.to_dict('records'), total
+
+    def pagina(self, pagina: int = 0, tamano: int = TAMANO_PAGINA, sort_by=None, filter_query=None):
+        """Devuelve (filas de la página, total de peticiones que cumplen el filtro)."""
+        clave = json.dumps([pagina, tamano, sort_by or [], filter_query or ""], sort_keys=True)
+        with self._lock:
+            lock_clave = self._locks.setdefault(clave, threading.Lock())
+
+        with lock_clave:
+            version = self._version()
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == version and time.monotonic() - entrada[1] < self.ttl:
+                return entrada[2]
+
+            resultado = self._consultar(pagina, tamano, sort_by, filter_query)
+            with self._lock:
+                if len(self._entradas) >= self.max_entradas:
+                    antigua = min(self._entradas, key=lambda c: self._entradas[c][1])
+                    del self._entradas[antigua]
+                    self._locks.pop(antigua, None)
+                # La versión es la de antes de consultar: si alguien insertó mientras tanto, la
+                # foto ya nace vieja y la siguiente lectura vuelve a consultar
+                self._entradas[clave] = (version, time.monotonic(), resultado)
+            return resultado
+
+    def contar(self) -> int:
+        """Peticiones pendientes; comparte la foto de la primera página sin filtros."""
+        return self.pagina()[1]
+
+
+cola = SnapshotCola()
+
+
+# Segundos entre recargas completas del índice; entre una y otra solo se leen las filas cambiadas
+RECARGA_INDICE = float(os.getenv("COLA_INDICE_RECARGA", "3600"))
+# Segundos tras los que se buscan cambios aunque la marca no haya cambiado (p. ej. ediciones
+# hechas directamente en MySQL)
+TTL_INDICE = float(os.getenv("COLA_INDICE_TTL", "60"))
+# Segundos hacia atrás del último `actualizado` visto que se vuelven a leer: una transacción
+# larga puede confirmar filas con un `actualizado` anterior al de otras ya leídas
+SOLAPE_INDICE = float(os.getenv("COLA_INDICE_SOLAPE", "30"))
+
+# Filas insertadas o cambiadas desde un momento (columna de migraciones/004_actualizado_peticion.sql)
+CONSULTA_CAMBIOS = """
+    SELECT id_peticion, fecha_petición, estado_petición, actualizado
+    FROM Peticion
+    WHERE actualizado >= %s
+    ORDER BY actualizado
+"""
+
+
+def _pendiente(estado) -> bool:
+    return estado is None or estado != 'Finalizada'
+
+
+class IndiceCola:
+    """
+    Índice ordenado de las peticiones pendientes para saber la posición de una en la cola.
+
+    Guarda las claves (fecha_petición, id_peticion) en una SortedList y un mapa id → clave:
+    la posición de una petición, agregarla y quitarla cuestan O(log n), sin COUNT(*) sobre
+    Peticion. Se carga una vez con una consulta sobre el índice de estado y fecha y se mantiene
+    al día con `agregar` y `quitar`.
+
+    Los cambios de otros procesos (otro worker, Sincronizacion.py, Importar.py) se aplican
+    por partes: cuando la marca de `SnapshotCola` cambia, o pasados `ttl` segundos, se leen
+    solo las filas con `actualizado` posterior al último visto (menos `solape` segundos) y
+    cada una se agrega o se quita según su estado. La recarga completa queda para cada
+    `recarga` segundos, por lo que no deja rastro en `actualizado` (filas borradas).
+    """
+
+    def __init__(self, snapshot: SnapshotCola, ttl: float = TTL_INDICE, recarga: float = RECARGA_INDICE,
+                 solape: float = SOLAPE_INDICE):
+        self.snapshot = snapshot
+        self.ttl = ttl
+        self.recarga = recarga
+        self.solape = timedelta(seconds=solape)
+        self._claves = SortedList()
+        self._por_id = {}
+        self._version = None
+        self._cargado = float("-inf")
+        self._revisado = float("-inf")
+        self._hasta = None
+        self._lock = threading.Lock()
+
+    def _cargar(self):
+        version = self.snapshot._version()
+        with obtener_conexion() as conn:
+            cursor = conn.cursor()
+            # Antes de leer la cola: lo que cambie mientras tanto entra en la siguiente revisión
+            cursor.execute("SELECT CURRENT_TIMESTAMP(6)")
+            hasta = cursor.fetchone()[0]
+            cursor.execute(
+                """
+                SELECT fecha_petición, id_peticion
+                FROM Peticion
+                WHERE estado_petición IS NULL OR estado_petición != 'Finalizada'
+                ORDER BY fecha_petición, id_peticion
+                """
+            )
+            claves = [tuple(fila) for fila in cursor.fetchall()]
+            cursor.close()
+        self._claves = SortedList(claves)
+        self._por_id = {id_: (fecha, id_) for fecha, id_ in claves}
+        self._version = version
+        self._hasta = hasta
+        self._cargado = self._revisado = time.monotonic()
+
+    def _actualizar(self):
+        """Aplica las filas insertadas o cambiadas desde la última lectura."""
+        version = self.snapshot._version()
+        with obtener_conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute(CONSULTA_CAMBIOS, (self._hasta - self.solape,))
+            cambios = cursor.fetchall()
+            cursor.close()
+        for id_, fecha, estado, actualizado in cambios:
+            anterior = self._por_id.get(id_)
+            if anterior is not None and (anterior[0] != fecha or not _pendiente(estado)):
+                self._quitar(id_)
+            if _pendiente(estado):
+                self._insertar(id_, fecha)
+            self._hasta = max(self._hasta, actualizado)
+        self._version = version
+        self._revisado = time.monotonic()
+
+    def _insertar(self, id_peticion, fecha_peticion):
+        if id_peticion not in self._por_id:
+            clave = (fecha_peticion, id_peticion)
+            self._claves.add(clave)
+            self._por_id[id_peticion] = clave
+
+    def _quitar(self, id_peticion):
+        clave = self._por_id.pop(id_peticion, None)
+        if clave is not None:
+            self._claves.discard(clave)
+
+    def posicion(self, id_peticion: int):
+        """
+        Devuelve (posición empezando en 1, total de pendientes), o None si la petición no está
+        pendiente.
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            if self._version is None or ahora - self._cargado >= self.recarga:
+                self._cargar()
+            elif self._version != self.snapshot._version() or ahora - self._revisado >= self.ttl:
+                self._actualizar()
+            clave = self._por_id.get(id_peticion)
+            if clave is None:
+                return None
+            return self._claves.bisect_left(clave) + 1, len(self._claves)
+
+    def agregar(self, id_peticion: int, fecha_peticion, versiones=None):
+        """
+        Registra una petición recién insertada. `versiones` son las que devolvió
+        `SnapshotCola.invalidar`: si el índice estaba al día, sigue estándolo sin consultar.
+        """
+        if isinstance(fecha_peticion, str):
+            fecha_peticion = datetime.strptime(fecha_peticion, "%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            if self._version is None:
+                return
+            self._insertar(id_peticion, fecha_peticion)
+            if versiones is not None and self._version == versiones[0]:
+                self._version = versiones[1]
+
+    def quitar(self, id_peticion: int):
+        """Saca una petición que se finalizó."""
+        with self._lock:
+            self._quitar(id_peticion)
+
+
+indice_cola = IndiceCola(cola)
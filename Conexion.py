@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+
+logger = logging.getLogger(__name__)
+
+# Conexiones abiertas por worker y segundos que se espera una libre antes de fallar
+TAMANO_POOL = int(os.getenv("DB_POOL_SIZE", "5"))
+ESPERA_MAX = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Préstamos que tardan más que esto (espera + uso) se registran como lentos
+UMBRAL_LENTO = float(os.getenv("DB_POOL_LENTO", "1"))
+# Una conexión inactiva por más de estos segundos se comprueba (ping) antes de prestarla
+VERIFICAR_TRAS = float(os.getenv("DB_POOL_PING", "30"))
+# Segundos (enteros) para conectar y para cada lectura o escritura en el socket: un servidor
+# colgado produce un error en lugar de bloquear el hilo indefinidamente
+TIMEOUT_CONEXION = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+TIMEOUT_LECTURA = int(os.getenv("DB_READ_TIMEOUT", "30"))
+TIMEOUT_ESCRITURA = int(os.getenv("DB_WRITE_TIMEOUT", "30"))
+
+
+def configuracion_db() -> dict:
+    """Parámetros de conexión a MySQL desde las variables de entorno."""
+    return {
+        "host": os.getenv("DB_HOST"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "database": os.getenv("DB_NAME"),
+        "port": int(os.getenv("DB_PORT", "3306")),
+        "connection_timeout": TIMEOUT_CONEXION,
+        "read_timeout": TIMEOUT_LECTURA,
+        "write_timeout": TIMEOUT_ESCRITURA,
+    }
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones a MySQL acotado en tamaño, uno por proceso.
+
+    Las conexiones se abren a medida que hacen falta (hasta `tamano`) y se reutilizan, así un
+    worker con poco tráfico no mantiene abiertas conexiones que no usa. Si no hay conexiones
+    libres se espera hasta `espera_max` segundos. Una conexión que estuvo inactiva más de
+    `VERIFICAR_TRAS` segundos se comprueba con un ping (y se reconecta si el servidor la cerró)
+    antes de prestarla. Al devolverla se deshace lo que no se confirmó (así tampoco queda
+    abierta la transacción de un SELECT) y, si falló la conexión misma, se descarta.
+
+    Si cambia el PID (workers de gunicorn --preload) el pool empieza vacío: un worker nunca usa
+    un socket abierto por el proceso maestro.
+
+    Se lleva la cuenta de préstamos, tiempo esperando una conexión y tiempo de uso (ver
+    `estadisticas`).
+    """
+
+    def __init__(self, tamano: int = TAMANO_POOL, espera_max: float = ESPERA_MAX, **configuracion):
+        self.tamano = tamano
+        self.espera_max = espera_max
+        self.configuracion = configuracion or None
+        self._pid = None
+        self._inactivas = []
+        self._libres = None
+        self._lock = threading.Lock()
+        self._reiniciar_estadisticas()
+
+    def _comprobar_pid(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    # Las conexiones del maestro no se cierran aquí: el socket es compartido
+                    self._inactivas = []
+                    self._libres = threading.BoundedSemaphore(self.tamano)
+                    self._reiniciar_estadisticas()
+                    self._pid = pid
+
+    def _reiniciar_estadisticas(self):
+        self._estadisticas = {"prestamos": 0, "errores": 0, "conexiones_abiertas": 0, "espera_s": 0.0,
+                              "espera_max_s": 0.0, "uso_s": 0.0, "uso_max_s": 0.0}
+
+    def _abrir(self):
+        conn = mysql.connector.connect(**(self.configuracion or configuracion_db()))
+        with self._lock:
+            self._estadisticas["conexiones_abiertas"] += 1
+        return conn
+
+    def _tomar(self):
+        with self._lock:
+            conn, devuelta = self._inactivas.pop() if self._inactivas else (None, None)
+        if conn is None:
+            return self._abrir()
+        if time.monotonic() - devuelta > VERIFICAR_TRAS:
+            conn.ping(reconnect=True, attempts=2, delay=0)
+        return conn
+
+    def _devolver(self, conn, descartar):
+        if not descartar:
+            try:
+                # Sin autocommit hasta un SELECT abre transacción; cerrarla evita que el
+                # siguiente préstamo lea una foto vieja de las tablas
+                if conn.in_transaction:
+                    conn.rollback()
+            except errors.Error:
+                descartar = True
+        if descartar:
+            try:
+                conn.close()
+            except errors.Error:
+                pass
+            return
+        with self._lock:
+            self._inactivas.append((conn, time.monotonic()))
+
+    def _registrar(self, espera, uso, error):
+        with self._lock:
+            e = self._estadisticas
+            e["prestamos"] += 1
+            e["errores"] += int(error)
+            e["espera_s"] += espera
+            e["uso_s"] += uso
+            e["espera_max_s"] = max(e["espera_max_s"], espera)
+            e["uso_max_s"] = max(e["uso_max_s"], uso)
+        if espera + uso > UMBRAL_LENTO:
+            logger.warning("Conexión MySQL lenta: %.3f s esperando y %.3f s en uso", espera, uso)
+
+    @contextmanager
+    def prestar(self):
+        """Presta una conexión del pool y la devuelve al salir del bloque."""
+        self._comprobar_pid()
+        inicio = time.perf_counter()
+        if not self._libres.acquire(timeout=self.espera_max):
+            raise errors.PoolError(f"No hubo conexiones libres en {self.espera_max} s")
+        try:
+            conn = self._tomar()
+        except Exception:
+            self._libres.release()
+            raise
+        prestada = time.perf_counter()
+        error = descartar = False
+        try:
+            yield conn
+        except Exception as e:
+            error = True
+            # Un error de la conexión (no de la consulta) la deja inservible
+            descartar = isinstance(e, (errors.OperationalError, errors.InterfaceError))
+            raise
+        finally:
+            self._devolver(conn, descartar)
+            self._libres.release()
+            self._registrar(prestada - inicio, time.perf_counter() - prestada, error)
+
+    def cerrar_inactivas(self):
+        """
+        Cierra las conexiones libres. El proceso maestro lo hace antes de crear los workers, para
+        no dejar abierta una conexión que ningún proceso vuelve a usar.
+        """
+        with self._lock:
+            inactivas, self._inactivas = self._inactivas, []
+        for conn, _ in inactivas:
+            try:
+                conn.close()
+            except errors.Error:
+                pass
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            e = dict(self._estadisticas)
+        prestamos = e["prestamos"] or 1
+        e["espera_media_s"] = e["espera_s"] / prestamos
+        e["uso_medio_s"] = e["uso_s"] / prestamos
+        return e
+
+
+pool = PoolConexiones()
+
+
+def obtener_conexion():
+    """Atajo para `pool.prestar()`: `with obtener_conexion() as conn: ...`"""
+    return pool.prestar()
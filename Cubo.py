@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from Indices import IndiceBitmap
+
+# Dimensiones del cubo de consumo; REGION va primero porque es el filtro de los dashboards.
+# TITLE no se cruza con DATE: esas celdas serían casi tantas como las filas, así que los títulos
+# van en un cubo aparte sin fecha
+DIMENSIONES = ["REGION", "GENRE", "DEVICE", "DATE"]
+DIMENSIONES_TITULO = ["REGION", "GENRE", "DEVICE", "TITLE"]
+
+
+def _agregar(df, dimensiones):
+    return (
+        df.groupby(dimensiones, observed=True, sort=False)["SCREENTIME"]
+        .agg(SCREENTIME="sum", VISTAS="size")
+        .reset_index()
+    )
+
+
+class CuboConsumo:
+    """
+    Cubo pre-agregado de consumo construido una sola vez al arrancar.
+
+    Cada celda guarda la suma de SCREENTIME y el número de vistas para una combinación de
+    REGION, GENRE, DEVICE y DATE; los títulos están en un segundo cubo REGION, GENRE, DEVICE y
+    TITLE. Ninguno crece con el número de filas, solo con el de valores de cada dimensión. A
+    partir de las celdas se precalculan proyecciones indexadas por REGION, de modo que una
+    consulta solo suma las filas de las regiones seleccionadas en lugar de recorrer el dataset
+    completo.
+
+    Si además se filtra por género, dispositivo o fechas (`filtros`, ver
+    `Indices.normalizar_filtros`), las celdas se seleccionan con un índice de bitmaps. El
+    cubo de títulos no tiene fechas: con un filtro de fechas el top de títulos sale de las filas.
+
+    La recurrencia (clientes por número de vistas) también se precalcula por región, como
+    histograma, para los clientes que ven en una sola región; los que ven en varias (pocos frente
+    al total) se guardan aparte con sus vistas por región y se combinan al consultar.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.celdas = _agregar(df, DIMENSIONES)
+        self.celdas_titulo = _agregar(df, DIMENSIONES_TITULO)
+        self.regiones = sorted(self.celdas["REGION"].unique())
+        self.proyecciones = {
+            dimension: self._proyectar(self.celdas, dimension) for dimension in ["GENRE", "DEVICE", "DATE"]
+        }
+        self.proyecciones["TITLE"] = self._proyectar(self.celdas_titulo, "TITLE")
+        self.proyecciones["REGION"] = (
+            self.celdas.groupby("REGION", observed=True)[["SCREENTIME", "VISTAS"]].sum()
+        )
+        self.indice = IndiceBitmap(self.celdas)
+        self.indice_titulo = IndiceBitmap(self.celdas_titulo, columna_fecha=None)
+        self._preparar_recurrencia(df)
+
+    def _preparar_recurrencia(self, df):
+        # Vistas por cliente y región (un cliente puede ver en varias regiones)
+        vistas = df.groupby(["REGION", "CUSTOMER_ID"], observed=True).size().rename("VISTAS").reset_index()
+        regiones_por_cliente = vistas["CUSTOMER_ID"].value_counts()
+        itinerante = vistas["CUSTOMER_ID"].isin(regiones_por_cliente.index[regiones_por_cliente > 1])
+
+        # Clientes de una sola región: histograma (REGION, VISTAS) → clientes
+        self.recurrencia_local = (
+            vistas[~itinerante].groupby(["REGION", "VISTAS"], observed=True).size()
+            .rename("CLIENTES")
+            .reset_index("VISTAS")
+            .sort_index()
+        )
+        # Clientes de varias regiones: sus vistas por región, con clientes y regiones como códigos
+        itinerantes = vistas[itinerante]
+        self.vistas_itinerantes = itinerantes.reset_index(drop=True)
+        self._region_itinerante = pd.Categorical(itinerantes["REGION"], categories=self.regiones).codes
+        self._cliente_itinerante = pd.factorize(itinerantes["CUSTOMER_ID"])[0]
+        self._vistas_itinerante = itinerantes["VISTAS"].to_numpy()
+
+    @staticmethod
+    def _proyectar(celdas, dimension):
+        return (
+            celdas.groupby(["REGION", dimension], observed=True)[["SCREENTIME", "VISTAS"]]
+            .sum()
+            .reset_index(dimension)
+            .sort_index()
+        )
+
+    def _celdas_region(self, dimension, regiones):
+        tabla = self.proyecciones[dimension]
+        if not regiones:
+            return tabla
+        return tabla.loc[tabla.index.intersection(regiones)]
+
+    def _celdas_filtradas(self, regiones, filtros, dimension=None):
+        if dimension == "TITLE":
+            if "DATE" in filtros:
+                raise ValueError("El cubo de títulos no tiene fechas; con un filtro de fechas use las filas")
+            return self.celdas_titulo[self.indice_titulo.mascara(REGION=regiones, **filtros)]
+        return self.celdas[self.indice.mascara(REGION=regiones, **filtros)]
+
+    def sumar(self, dimension: str, regiones=None, filtros=None) -> pd.DataFrame:
+        """Suma SCREENTIME y VISTAS por `dimension` para las regiones dadas (todas si está vacío)."""
+        if filtros:
+            celdas = self._celdas_filtradas(regiones, filtros, dimension)
+            return celdas.groupby(dimension, observed=True, as_index=False)[["SCREENTIME", "VISTAS"]].sum()
+
+        celdas = self._celdas_region(dimension, regiones)
+        if dimension == "REGION":
+            return celdas.reset_index()
+        return celdas.groupby(dimension, observed=True, as_index=False)[["SCREENTIME", "VISTAS"]].sum()
+
+    def region_genero(self, regiones=None, filtros=None) -> pd.DataFrame:
+        """Devuelve SCREENTIME por REGION y GENRE para las regiones dadas."""
+        if filtros:
+            celdas = self._celdas_filtradas(regiones, filtros)
+            return celdas.groupby(["REGION", "GENRE"], observed=True, as_index=False)[["SCREENTIME", "VISTAS"]].sum()
+        return self._celdas_region("GENRE", regiones).reset_index()
+
+    def recurrencia(self, regiones=None) -> pd.Series:
+        """Número de clientes (valores) con cada número de vistas (índice) en las regiones dadas."""
+        locales = self.recurrencia_local
+        if regiones:
+            locales = locales.loc[locales.index.intersection(regiones)]
+        histograma = locales.groupby("VISTAS")["CLIENTES"].sum()
+
+        seleccion = slice(None)
+        if regiones:
+            codigos = [self.regiones.index(r) for r in regiones if r in self.regiones]
+            seleccion = np.isin(self._region_itinerante, codigos)
+        por_cliente = np.bincount(self._cliente_itinerante[seleccion], weights=self._vistas_itinerante[seleccion])
+        vistas, clientes = np.unique(por_cliente[por_cliente > 0].astype(np.int64), return_counts=True)
+        return histograma.add(pd.Series(clientes, index=vistas), fill_value=0).astype(np.int64).sort_index()
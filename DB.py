@@ -1,7 +1,11 @@
-import pandas as pd
 import plotly.express as px
 import streamlit as st
 from dotenv import load_dotenv
+from Cubo import CuboConsumo
+from Datos import cargar_dataset, version_dataset
+from Figuras import histograma_de_conteos
+from Indices import IndiceBitmap, normalizar_filtros
+from Sketches import SketchesClientes, kpis_exactos
 
 load_dotenv()
 
@@ -9,70 +13,96 @@ load_dotenv()
 st.set_page_config(page_title="Dashboard de Consumo de Contenido", layout="wide")
 st.title("Dashboard de Consumo de Contenido")
 
-# Cargar dataset
-df = pd.read_excel("DATA/Examen.xlsx", sheet_name="Dataset")
-#un cambio jsjsj
-# Normalizar columnas
-df.columns = df.columns.str.strip().str.upper().str.replace(" ", "_")
+
+# Cargar dataset (desde la copia columnar, ya con las columnas normalizadas) y construir sus
+# estructuras derivadas una sola vez por versión del libro, no en cada rerun de Streamlit
+@st.cache_resource
+def cargar_estructuras(version):
+    df = cargar_dataset()
+    return df, CuboConsumo(df), SketchesClientes(df), IndiceBitmap(df)
+
+
+df, cubo, sketches, indice_filas = cargar_estructuras(version_dataset())
 
 # Filtro por región
-regiones = df["REGION"].unique()
+regiones = list(df["REGION"].cat.categories)
 selected_regions = st.multiselect("Selecciona Región:", options=regiones, default=list(regiones))
 
-if selected_regions:
-    dff = df[df["REGION"].isin(selected_regions)]
+# Filtros por género, dispositivo y fechas
+generos = st.multiselect("Selecciona Género:", options=list(df["GENRE"].cat.categories))
+dispositivos = st.multiselect("Selecciona Dispositivo:", options=list(df["DEVICE"].cat.categories))
+fecha_min, fecha_max = df["DATE"].min().date(), df["DATE"].max().date()
+rango_fechas = st.date_input("Selecciona rango de fechas:", value=(fecha_min, fecha_max),
+                             min_value=fecha_min, max_value=fecha_max)
+# Mientras se elige el rango, date_input devuelve solo la fecha inicial
+fecha_inicio = rango_fechas[0] if len(rango_fechas) > 0 and rango_fechas[0] != fecha_min else None
+fecha_fin = rango_fechas[1] if len(rango_fechas) > 1 and rango_fechas[1] != fecha_max else None
+filtros = normalizar_filtros(generos, dispositivos, fecha_inicio, fecha_fin)
+
+# Las filas se seleccionan con el índice de bitmaps en lugar de un isin por filtro
+if selected_regions or filtros:
+    dff = df[indice_filas.mascara(REGION=selected_regions, **filtros)]
 else:
-    dff = df.copy()
+    dff = df
 
 # ----------------- KPIs -----------------
+exacto = st.checkbox("Calcular KPIs de clientes en modo exacto (auditoría)", value=False)
+if filtros:
+    # Los sketches son por región; con otros filtros se cuentan las filas seleccionadas
+    num_clients, multi_device_pct = kpis_exactos(dff)
+else:
+    num_clients, multi_device_pct = sketches.kpis(selected_regions, exacto=exacto)
+
 col1, col2, col3 = st.columns(3)
 
 # KPI 1: Clientes que consumen video
-num_clients = dff["CUSTOMER_ID"].nunique()
 col1.metric("Clientes que consumen video", f"{num_clients}")
 
 # KPI 2: Género más visto
-top_genre = dff.groupby("GENRE")["SCREENTIME"].sum().idxmax()
+screentime_genero = dff.groupby("GENRE", observed=True)["SCREENTIME"].sum()
+top_genre = screentime_genero.idxmax() if not screentime_genero.empty else "-"
 col2.metric("Género más visto", f"{top_genre}")
 
 # KPI 3: Usuarios multi-dispositivo
-device_count = dff.groupby("CUSTOMER_ID")["DEVICE"].nunique()
-multi_device_pct = (device_count > 1).mean() * 100
 col3.metric("Usuarios multi-dispositivo", f"{multi_device_pct:.1f}%")
 
 # ----------------- Gráficos -----------------
 st.markdown("---")
 st.subheader("Tiempo de pantalla por género")
-fig_genre = px.bar(dff.groupby("GENRE", as_index=False)["SCREENTIME"].sum(),
+fig_genre = px.bar(dff.groupby("GENRE", observed=True, as_index=False)["SCREENTIME"].sum(),
                    x="GENRE", y="SCREENTIME", title="Tiempo de pantalla por género")
 st.plotly_chart(fig_genre, use_container_width=True)
 
 st.subheader("Distribución de dispositivos")
-fig_device = px.pie(dff, names="DEVICE", title="Distribución de dispositivos")
+fig_device = px.pie(cubo.sumar("DEVICE", selected_regions, filtros), names="DEVICE", values="VISTAS",
+                    title="Distribución de dispositivos")
 st.plotly_chart(fig_device, use_container_width=True)
 
 st.subheader("Evolución del consumo en el tiempo")
-dff_time = dff.groupby("DATE", as_index=False)["SCREENTIME"].sum()
+dff_time = dff.groupby("DATE", observed=True, as_index=False)["SCREENTIME"].sum()
 fig_time = px.line(dff_time, x="DATE", y="SCREENTIME", title="Evolución del consumo")
 st.plotly_chart(fig_time, use_container_width=True)
 
 st.subheader("Consumo por región")
-fig_region = px.bar(dff.groupby("REGION", as_index=False)["SCREENTIME"].sum(),
+fig_region = px.bar(dff.groupby("REGION", observed=True, as_index=False)["SCREENTIME"].sum(),
                     x="REGION", y="SCREENTIME", title="Consumo por región")
 st.plotly_chart(fig_region, use_container_width=True)
 
 st.subheader("Top 10 contenido más visto")
-top_content = dff.groupby("TITLE")["SCREENTIME"].sum().sort_values(ascending=False).head(10).reset_index()
+top_content = dff.groupby("TITLE", observed=True)["SCREENTIME"].sum().sort_values(ascending=False).head(10).reset_index()
 fig_top = px.bar(top_content, x="TITLE", y="SCREENTIME", title="Top 10 contenido más visto")
 st.plotly_chart(fig_top, use_container_width=True)
 
 st.subheader("Recurrencia de consumo por cliente")
-consumption_counts = dff.groupby("CUSTOMER_ID").size().reset_index(name="count")
-fig_recurrence = px.histogram(consumption_counts, x="count", nbins=20, title="Recurrencia de consumo por cliente")
+if filtros:
+    recurrencia = dff.groupby("CUSTOMER_ID", observed=True).size().value_counts()
+else:
+    recurrencia = cubo.recurrencia(selected_regions)
+fig_recurrence = histograma_de_conteos(recurrencia, nbins=20, title="Recurrencia de consumo por cliente")
 st.plotly_chart(fig_recurrence, use_container_width=True)
 
 st.subheader("Relación entre región y género")
-region_genre = dff.groupby(["REGION", "GENRE"])["SCREENTIME"].sum().reset_index()
+region_genre = dff.groupby(["REGION", "GENRE"], observed=True)["SCREENTIME"].sum().reset_index()
 fig_heatmap = px.density_heatmap(region_genre, x="REGION", y="GENRE", z="SCREENTIME",
                                  title="Relación entre región y género")
 st.plotly_chart(fig_heatmap, use_container_width=True)
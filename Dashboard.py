@@ -1,16 +1,49 @@
-import pandas as pd
 import plotly.express as px
-from dash import Dash, dcc, html, Input, Output
+from dash import ClientsideFunction, Dash, dcc, html, Input, Output
+import logging
 import os
 from dotenv import load_dotenv
+from Arranque import fase
+from Cache import CacheFiguras, normalizar_regiones
+from Cliente import construir_datos_cliente
+from Datos import cargar_dataset, version_dataset
+from Cubo import CuboConsumo
+from Figuras import histograma_de_conteos, reportar_payload
+from Indices import IndiceBitmap, normalizar_filtros
+from Sketches import SketchesClientes, kpis_exactos
 
 load_dotenv()
 
 # Cargar dataset
-df = pd.read_excel("Exámen.xlsx", sheet_name="Dataset")
+with fase("dataset"):
+    df = cargar_dataset()
+
+# Cubo pre-agregado para que los callbacks no recorran las filas en cada cambio de región
+with fase("cubo"):
+    cubo = CuboConsumo(df)
+
+# Sketches por región para los KPIs de clientes; KPIS_EXACTOS=1 los calcula exactos (auditoría)
+with fase("sketches"):
+    sketches = SketchesClientes(df)
+KPIS_EXACTOS = os.getenv("KPIS_EXACTOS") == "1"
+
+# Índice de bitmaps sobre las filas para los KPIs por cliente cuando hay filtros además de región
+with fase("índice de filas"):
+    indice_filas = IndiceBitmap(df)
+
+# Caché de figuras y KPIs por selección de regiones; CACHE_FIGURAS_DIR la comparte entre workers
+with fase("versión del dataset"):
+    VERSION_DATASET = version_dataset()
+cache_figuras = CacheFiguras(
+    max_bytes=int(os.getenv("CACHE_FIGURAS_MB", "64")) * 1024 * 1024,
+    directorio=os.getenv("CACHE_FIGURAS_DIR"),
+)
+
+# DASHBOARD_CLIENTE=1 envía los agregados por región una sola vez y filtra en el navegador
+MODO_CLIENTE = os.getenv("DASHBOARD_CLIENTE") == "1"
 
-# Inicializar app
-app = Dash(__name__)
+# Inicializar app; wsgi.py la monta en /dashboard/ (DASHBOARD_PREFIJO) junto al formulario
+app = Dash(__name__, requests_pathname_prefix=os.getenv("DASHBOARD_PREFIJO", "/"))
 
 # Layout del dashboard
 app.layout = html.Div([
@@ -25,6 +58,32 @@ app.layout = html.Div([
         value=[]
     ),
 
+    # Filtros por género, dispositivo y fechas (solo en modo servidor; el modo cliente filtra por región)
+    html.Div([
+        html.Label("Selecciona Género:"),
+        dcc.Dropdown(
+            id="genre_filter",
+            options=[{"label": g, "value": g} for g in df["GENRE"].cat.categories],
+            multi=True,
+            value=[]
+        ),
+        html.Label("Selecciona Dispositivo:"),
+        dcc.Dropdown(
+            id="device_filter",
+            options=[{"label": d, "value": d} for d in df["DEVICE"].cat.categories],
+            multi=True,
+            value=[]
+        ),
+        html.Label("Selecciona rango de fechas:"),
+        html.Br(),
+        dcc.DatePickerRange(
+            id="date_filter",
+            min_date_allowed=df["DATE"].min().date(),
+            max_date_allowed=df["DATE"].max().date(),
+            clearable=True
+        ),
+    ], hidden=MODO_CLIENTE),
+
     html.Br(),
 
     # KPIs
@@ -43,72 +102,110 @@ app.layout = html.Div([
     dcc.Graph(id="region_chart"),
     dcc.Graph(id="top_content_chart"),
     dcc.Graph(id="recurrence_chart"),
-    dcc.Graph(id="region_genre_heatmap")
+    dcc.Graph(id="region_genre_heatmap"),
+
+    # Agregados por región para el modo cliente (vacío en modo servidor)
+    dcc.Store(id="datos_regiones", data=construir_datos_cliente(cubo, sketches) if MODO_CLIENTE else None)
 ])
 
-# Callback para actualizar gráficos y KPIs
-@app.callback(
-    [Output("genre_chart", "figure"),
-     Output("device_chart", "figure"),
-     Output("time_series", "figure"),
-     Output("region_chart", "figure"),
-     Output("top_content_chart", "figure"),
-     Output("recurrence_chart", "figure"),
-     Output("region_genre_heatmap", "figure"),
-     Output("kpi_clients", "children"),
-     Output("kpi_top_genre", "children"),
-     Output("kpi_multi_device", "children")],
-    [Input("region_filter", "value")]
-)
-def update_dashboard(selected_regions):
-    dff = df.copy()
-    if selected_regions:
-        dff = dff[dff["REGION"].isin(selected_regions)]
+SALIDAS = [Output("genre_chart", "figure"),
+           Output("device_chart", "figure"),
+           Output("time_series", "figure"),
+           Output("region_chart", "figure"),
+           Output("top_content_chart", "figure"),
+           Output("recurrence_chart", "figure"),
+           Output("region_genre_heatmap", "figure"),
+           Output("kpi_clients", "children"),
+           Output("kpi_top_genre", "children"),
+           Output("kpi_multi_device", "children")]
+
+
+def update_dashboard(selected_regions, generos=None, dispositivos=None, fecha_inicio=None, fecha_fin=None):
+    regiones = normalizar_regiones(selected_regions)
+    filtros = normalizar_filtros(generos, dispositivos, fecha_inicio, fecha_fin)
+    clave = CacheFiguras.clave(regiones, VERSION_DATASET, KPIS_EXACTOS, filtros)
+    bundle = cache_figuras.obtener(clave)
+    if bundle is None:
+        bundle = cache_figuras.guardar(clave, construir_dashboard(list(regiones), filtros))
+    return bundle
+
+
+def construir_dashboard(selected_regions, filtros=None):
+    # Todo sale del cubo y los sketches; con filtros adicionales, los KPIs por cliente y la
+    # recurrencia salen de las filas seleccionadas con el índice de bitmaps
+    if filtros:
+        dff = df[indice_filas.mascara(REGION=selected_regions, **filtros)]
+        num_clients, multi_device_pct = kpis_exactos(dff)
+        recurrencia = dff.groupby("CUSTOMER_ID", observed=True).size().value_counts()
+    else:
+        num_clients, multi_device_pct = sketches.kpis(selected_regions, exacto=KPIS_EXACTOS)
+        recurrencia = cubo.recurrencia(selected_regions)
 
     # KPI 1: Clientes que consumen video
-    num_clients = dff["CUSTOMER_ID"].nunique()
     kpi_clients = html.Div([html.H3("Clientes que consumen video"), html.H1(f"{num_clients}")])
 
     # KPI 2: Género más visto
-    top_genre = dff.groupby("GENRE")["SCREENTIME"].sum().idxmax()
+    por_genero = cubo.sumar("GENRE", selected_regions, filtros)
+    top_genre = por_genero.set_index("GENRE")["SCREENTIME"].idxmax() if not por_genero.empty else "-"
     kpi_top_genre = html.Div([html.H3("Género más visto"), html.H1(f"{top_genre}")])
 
     # KPI 3: Usuarios multi-dispositivo
-    device_count = dff.groupby("CUSTOMER_ID")["DEVICE"].nunique()
-    multi_device_pct = (device_count > 1).mean() * 100
     kpi_multi_device = html.Div([html.H3("Usuarios multi-dispositivo"), html.H1(f"{multi_device_pct:.1f}%")])
 
     # Gráfico 1: Tiempo de pantalla por género
-    fig1 = px.bar(dff.groupby("GENRE", as_index=False)["SCREENTIME"].sum(),
+    fig1 = px.bar(por_genero,
                   x="GENRE", y="SCREENTIME",
                   title="Tiempo de pantalla por género")
 
-    # Gráfico 2: Distribución de dispositivos
-    fig2 = px.pie(dff, names="DEVICE", title="Distribución de dispositivos")
+    # Gráfico 2: Distribución de dispositivos (vistas por dispositivo ya contadas en el cubo)
+    por_dispositivo = cubo.sumar("DEVICE", selected_regions, filtros)
+    fig2 = px.pie(por_dispositivo, names="DEVICE", values="VISTAS", title="Distribución de dispositivos")
 
     # Gráfico 3: Evolución del consumo en el tiempo
-    dff_time = dff.groupby("DATE", as_index=False)["SCREENTIME"].sum()
+    dff_time = cubo.sumar("DATE", selected_regions, filtros).sort_values("DATE")
     fig3 = px.line(dff_time, x="DATE", y="SCREENTIME", title="Evolución del consumo")
 
     # Gráfico 4: Consumo por región
-    fig4 = px.bar(dff.groupby("REGION", as_index=False)["SCREENTIME"].sum(),
+    fig4 = px.bar(cubo.sumar("REGION", selected_regions, filtros),
                   x="REGION", y="SCREENTIME", title="Consumo por región")
 
-    # Gráfico 5: Top 10 contenido más visto
-    top_content = dff.groupby("TITLE")["SCREENTIME"].sum().sort_values(ascending=False).head(10).reset_index()
+    # Gráfico 5: Top 10 contenido más visto (el cubo de títulos no tiene fechas)
+    if filtros and "DATE" in filtros:
+        por_titulo = dff.groupby("TITLE", observed=True, as_index=False)["SCREENTIME"].sum()
+    else:
+        por_titulo = cubo.sumar("TITLE", selected_regions, filtros)
+    top_content = por_titulo.nlargest(10, "SCREENTIME")
     fig5 = px.bar(top_content, x="TITLE", y="SCREENTIME", title="Top 10 contenido más visto")
 
     # Gráfico 6: Recurrencia de consumo por cliente
-    consumption_counts = dff.groupby("CUSTOMER_ID").size().reset_index(name="count")
-    fig6 = px.histogram(consumption_counts, x="count", nbins=20, title="Recurrencia de consumo por cliente")
+    fig6 = histograma_de_conteos(recurrencia, nbins=20, title="Recurrencia de consumo por cliente")
 
     # Gráfico 7: Heatmap de región vs género
-    region_genre = dff.groupby(["REGION","GENRE"])["SCREENTIME"].sum().reset_index()
+    region_genre = cubo.region_genero(selected_regions, filtros)
     fig7 = px.density_heatmap(region_genre, x="REGION", y="GENRE", z="SCREENTIME",
                               title="Relación entre región y género")
 
-    return fig1, fig2, fig3, fig4, fig5, fig6, fig7, kpi_clients, kpi_top_genre, kpi_multi_device
+    reportar_payload({"genre_chart": fig1, "device_chart": fig2, "time_series": fig3, "region_chart": fig4,
+                      "top_content_chart": fig5, "recurrence_chart": fig6, "region_genre_heatmap": fig7})
+
+    return [fig1, fig2, fig3, fig4, fig5, fig6, fig7, kpi_clients, kpi_top_genre, kpi_multi_device]
+
+# Callback para actualizar gráficos y KPIs
+if MODO_CLIENTE:
+    # Lo resuelve assets/dashboard_cliente.js en el navegador, sin ida y vuelta al servidor
+    app.clientside_callback(
+        ClientsideFunction(namespace="dashboard", function_name="actualizar"),
+        SALIDAS,
+        [Input("region_filter", "value"), Input("datos_regiones", "data")]
+    )
+else:
+    app.callback(SALIDAS, [Input("region_filter", "value"),
+                           Input("genre_filter", "value"),
+                           Input("device_filter", "value"),
+                           Input("date_filter", "start_date"),
+                           Input("date_filter", "end_date")])(update_dashboard)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
     app.run(host="127.0.0.1", port=8053, debug=True)
 
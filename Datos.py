@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+# Ruta del libro de Excel y hoja con los datos de consumo. DATASET permite apuntar a otro libro
+# o directamente a un archivo Arrow IPC ya compacto (p. ej. los que genera bench/generar.py)
+RUTA_EXCEL = os.getenv("DATASET", "DATA/Examen.xlsx")
+HOJA = "Dataset"
+
+# Arrow IPC sin comprimir: se puede mapear en memoria y compartir entre procesos sin copias.
+# Cambiar el formato invalida las copias columnares existentes.
+FORMATO = "arrow-ipc-compacto"
+
+# Columnas que usan los dashboards; el resto de la hoja no se guarda
+COLUMNAS_TEXTO = ["CUSTOMER_ID", "REGION", "DEVICE", "TITLE", "GENRE"]
+COLUMNAS = ["DATE", *COLUMNAS_TEXTO, "SCREENTIME"]
+
+
+def _es_columnar(ruta):
+    return ruta.endswith((".feather", ".arrow"))
+
+
+def _rutas_cache(ruta_excel, hoja):
+    """Devuelve las rutas de la copia columnar y de su archivo de metadatos junto al libro."""
+    base, _ = os.path.splitext(ruta_excel)
+    return f"{base}.{hoja}.feather", f"{base}.{hoja}.meta.json"
+
+
+def _hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _leer_meta(ruta_meta):
+    try:
+        with open(ruta_meta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_atomico(ruta, escribir):
+    # Escribimos a un temporal y lo movemos para que otro proceso nunca lea un archivo a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def _guardar_meta(ruta_meta, meta):
+    def escribir(temporal):
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    _escribir_atomico(ruta_meta, escribir)
+
+
+def normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """Normaliza los nombres de columnas: sin espacios extremos, en mayúsculas y con guion bajo."""
+    df.columns = df.columns.str.strip().str.upper().str.replace(" ", "_")
+    return df
+
+
+def compactar(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Representación compacta del dataset: solo las columnas usadas, textos como categorías
+    (códigos enteros + diccionario), SCREENTIME con el entero más pequeño posible y DATE como
+    fecha nativa. Los groupby e isin trabajan así sobre arreglos de enteros pequeños.
+    """
+    df = df[COLUMNAS].copy()
+    # Los textos pasan por str porque hay columnas con tipos mezclados (p. ej. CUSTOMER_ID)
+    for columna in COLUMNAS_TEXTO:
+        df[columna] = df[columna].astype(str).astype("category")
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    screentime = df["SCREENTIME"]
+    df["SCREENTIME"] = pd.to_numeric(screentime, downcast="unsigned" if (screentime >= 0).all() else "integer")
+    return df
+
+
+def _convertir_excel(ruta_excel, hoja, ruta_columnar):
+    df = compactar(normalizar_columnas(pd.read_excel(ruta_excel, sheet_name=hoja)))
+    _escribir_atomico(ruta_columnar, lambda temporal: df.to_feather(temporal, compression="uncompressed"))
+    return df
+
+
+def leer_columnar(ruta_columnar: str) -> pd.DataFrame:
+    """
+    Lee la copia columnar mapeándola en memoria.
+
+    Las columnas numéricas y de texto quedan respaldadas por el mapa del archivo, no por memoria
+    propia del proceso, así que todos los workers que leen el mismo archivo comparten las mismas
+    páginas del caché del sistema operativo.
+    """
+    tabla = feather.read_table(ruta_columnar, memory_map=True)
+    return tabla.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def cargar_dataset(ruta_excel: str = RUTA_EXCEL, hoja: str = HOJA) -> pd.DataFrame:
+    """
+    Carga la hoja de datos desde una copia columnar (Arrow IPC) guardada junto al libro.
+
+    La copia se regenera solo cuando cambia el libro: si el mtime y el tamaño coinciden con los
+    metadatos se lee directamente; si no, se compara el hash del contenido antes de volver a
+    convertir el Excel. Si la ruta ya es un archivo Arrow IPC se lee tal cual. El resultado está
+    mapeado en memoria (ver `leer_columnar`).
+    """
+    if _es_columnar(ruta_excel):
+        return leer_columnar(ruta_excel)
+
+    ruta_columnar, ruta_meta = _rutas_cache(ruta_excel, hoja)
+    estado = os.stat(ruta_excel)
+    meta = _leer_meta(ruta_meta)
+
+    if os.path.exists(ruta_columnar) and meta.get("hoja") == hoja and meta.get("formato") == FORMATO:
+        if meta.get("mtime_ns") == estado.st_mtime_ns and meta.get("tamano") == estado.st_size:
+            return leer_columnar(ruta_columnar)
+
+        # El mtime cambió (copia, checkout...) pero el contenido puede ser el mismo
+        sha256 = _hash_archivo(ruta_excel)
+        if meta.get("sha256") == sha256:
+            meta.update(mtime_ns=estado.st_mtime_ns, tamano=estado.st_size)
+            _guardar_meta(ruta_meta, meta)
+            return leer_columnar(ruta_columnar)
+    else:
+        sha256 = _hash_archivo(ruta_excel)
+
+    _convertir_excel(ruta_excel, hoja, ruta_columnar)
+    _guardar_meta(ruta_meta, {
+        "hoja": hoja,
+        "formato": FORMATO,
+        "mtime_ns": estado.st_mtime_ns,
+        "tamano": estado.st_size,
+        "sha256": sha256,
+    })
+    # Devolvemos la versión mapeada, no la recién convertida, para no duplicar memoria
+    return leer_columnar(ruta_columnar)
+
+
+def version_dataset(ruta_excel: str = RUTA_EXCEL, hoja: str = HOJA) -> str:
+    """Hash SHA-256 del contenido actual del libro, útil como clave para cachear estructuras derivadas."""
+    estado = os.stat(ruta_excel)
+    if _es_columnar(ruta_excel):
+        # Un archivo columnar no tiene metadatos propios; basta con su ruta, mtime y tamaño
+        firma = f"{os.path.abspath(ruta_excel)}:{estado.st_mtime_ns}:{estado.st_size}"
+        return hashlib.sha256(firma.encode("utf-8")).hexdigest()
+
+    _, ruta_meta = _rutas_cache(ruta_excel, hoja)
+    meta = _leer_meta(ruta_meta)
+    if meta.get("mtime_ns") == estado.st_mtime_ns and meta.get("tamano") == estado.st_size:
+        return meta["sha256"]
+    return _hash_archivo(ruta_excel)
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+# Libro de Excel con la columna `email` (exportado de Slack)
+RUTA_CORREOS = os.getenv("SLACK")
+# Coincidencias que se devuelven al buscar
+MAX_RESULTADOS = int(os.getenv("DIRECTORIO_MAX_RESULTADOS", "20"))
+
+ESQUEMA = """
+CREATE TABLE correos (email TEXT NOT NULL, clave TEXT PRIMARY KEY);
+CREATE TABLE meta (mtime_ns INTEGER, tamano INTEGER);
+"""
+# Índice de trigramas para buscar por cualquier parte del correo (SQLite >= 3.34)
+ESQUEMA_TRIGRAMAS = "CREATE VIRTUAL TABLE correos_fts USING fts5(clave, tokenize='trigram')"
+
+
+def _escapar_like(texto):
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class DirectorioCorreos:
+    """
+    Directorio de correos compilado a SQLite junto al libro de origen, para buscar sin cargar
+    la lista completa en el layout.
+
+    La copia se vuelve a compilar cuando cambia el mtime o el tamaño del libro (igual que la
+    copia columnar de `Datos.cargar_dataset`). `buscar` devuelve primero los correos que
+    empiezan por el texto (rango sobre la clave en minúsculas) y después los que lo contienen
+    (índice de trigramas FTS5; con menos de 3 caracteres, o si SQLite no tiene trigramas, un
+    LIKE sobre la tabla).
+    """
+
+    def __init__(self, ruta_excel: str = RUTA_CORREOS, ruta_indice: str = None):
+        self.ruta_excel = ruta_excel
+        self.ruta_indice = ruta_indice or f"{os.path.splitext(ruta_excel)[0]}.correos.sqlite3"
+        self._firma = None
+        self._trigramas = False
+        self._lock = threading.Lock()
+
+    def _firma_origen(self):
+        estado = os.stat(self.ruta_excel)
+        return estado.st_mtime_ns, estado.st_size
+
+    def _firma_indice(self):
+        try:
+            with closing(sqlite3.connect(self.ruta_indice)) as conn:
+                fila = conn.execute("SELECT mtime_ns, tamano FROM meta").fetchone()
+                trigramas = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'correos_fts'").fetchone() is not None
+            return (tuple(fila) if fila else None), trigramas
+        except sqlite3.Error:
+            return None, False
+
+    def _compilar(self, firma):
+        df = pd.read_excel(self.ruta_excel)
+        correos = df["email"].dropna().astype(str).str.strip()
+        correos = correos[correos != ""]
+        filas = list(pd.DataFrame({"email": correos, "clave": correos.str.lower()})
+                     .drop_duplicates("clave").itertuples(index=False, name=None))
+
+        # Se compila en un temporal y se reemplaza, así ningún proceso lee un índice a medias
+        temporal = f"{self.ruta_indice}.{os.getpid()}.tmp"
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        conn = sqlite3.connect(temporal)
+        try:
+            conn.executescript(ESQUEMA)
+            conn.executemany("INSERT INTO correos (email, clave) VALUES (?, ?)", filas)
+            try:
+                conn.execute(ESQUEMA_TRIGRAMAS)
+                conn.execute("INSERT INTO correos_fts (rowid, clave) SELECT rowid, clave FROM correos")
+            except sqlite3.OperationalError:
+                pass
+            conn.execute("INSERT INTO meta VALUES (?, ?)", firma)
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(temporal, self.ruta_indice)
+
+    def _actualizar(self):
+        firma = self._firma_origen()
+        if firma == self._firma:
+            return
+        with self._lock:
+            if firma == self._firma:
+                return
+            firma_indice, trigramas = self._firma_indice()
+            if firma_indice != firma:
+                self._compilar(firma)
+                firma_indice, trigramas = self._firma_indice()
+            self._trigramas = trigramas
+            self._firma = firma
+
+    def buscar(self, texto: str, limite: int = MAX_RESULTADOS) -> list:
+        """Correos que empiezan por `texto` y, después, los que lo contienen; como mucho `limite`."""
+        texto = (texto or "").strip().lower()
+        if not texto:
+            return []
+        self._actualizar()
+
+        with closing(sqlite3.connect(self.ruta_indice)) as conn:
+            # Prefijo: rango sobre la clave primaria, sin recorrer la tabla
+            resultados = [fila[0] for fila in conn.execute(
+                "SELECT email FROM correos WHERE clave >= ? AND clave < ? ORDER BY clave LIMIT ?",
+                (texto, texto + "\uffff", limite),
+            )]
+            if len(resultados) < limite:
+                if self._trigramas and len(texto) >= 3:
+                    consulta = conn.execute(
+                        "SELECT c.email FROM correos_fts f JOIN correos c ON c.rowid = f.rowid "
+                        "WHERE correos_fts MATCH ? ORDER BY c.clave LIMIT ?",
+                        ('"' + texto.replace('"', '""') + '"', limite * 2),
+                    )
+                else:
+                    consulta = conn.execute(
+                        "SELECT email FROM correos WHERE clave LIKE ? ESCAPE '\\' ORDER BY clave LIMIT ?",
+                        (f"%{_escapar_like(texto)}%", limite * 2),
+                    )
+                vistos = set(resultados)
+                for (email,) in consulta:
+                    if email not in vistos and len(resultados) < limite:
+                        resultados.append(email)
+                        vistos.add(email)
+        return resultados
+
+
+directorio = DirectorioCorreos() if RUTA_CORREOS else None
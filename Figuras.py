@@ -0,0 +1,47 @@
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+logger = logging.getLogger(__name__)
+
+
+def histograma_de_conteos(conteos: pd.Series, nbins: int = 20, x: str = "count", title: str = None):
+    """
+    Histograma con los intervalos calculados en el servidor, a partir de cuántas veces
+    (valores) aparece cada valor (índice), p. ej. `CuboConsumo.recurrencia`.
+
+    En lugar de enviar un valor por cliente para que Plotly agrupe en el navegador, se envían
+    solo `nbins` barras con su conteo. Los intervalos son enteros y de igual ancho.
+    """
+    conteos = conteos[conteos > 0]
+    if conteos.empty:
+        return px.bar(pd.DataFrame({x: [], "clientes": []}), x=x, y="clientes", title=title)
+
+    valores = conteos.index.to_numpy()
+    minimo, maximo = int(valores.min()), int(valores.max())
+    ancho = max(1, math.ceil((maximo - minimo + 1) / nbins))
+    bordes = np.arange(minimo, maximo + ancho + 1, ancho)
+    conteos, _ = np.histogram(valores, bins=bordes, weights=conteos.to_numpy())
+    conteos = conteos.astype(np.int64)
+
+    agrupado = pd.DataFrame({x: bordes[:-1] + (ancho - 1) / 2, "clientes": conteos})
+    fig = px.bar(agrupado, x=x, y="clientes", title=title)
+    fig.update_traces(width=ancho)
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def tamano_payload(fig) -> int:
+    """Bytes del JSON de la figura, es decir, lo que viaja al navegador."""
+    return len(fig.to_json().encode("utf-8"))
+
+
+def reportar_payload(figuras: dict):
+    """Registra (nivel INFO) el tamaño serializado de cada figura."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    for nombre, fig in figuras.items():
+        logger.info("Payload de %s: %d bytes", nombre, tamano_payload(fig))
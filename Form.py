@@ -1,52 +1,32 @@
 import dash_table
-from dash import Dash, html, dcc, callback, Output, Input, State
+from dash import Dash, html, dcc, Output, Input, State, no_update
 import dash_bootstrap_components as dbc
 from datetime import date, datetime, timedelta
-import pandas as pd
-import mysql.connector
 from dash.exceptions import PreventUpdate
+from flask import jsonify
 from dotenv import load_dotenv
+import logging
+import math
 import os
-import requests
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
 load_dotenv()
 
-#Cargamos las variables de entorno de notion
-# Token y DB de Notion desde variables de entorno
-NOTION_TOKEN = os.getenv("NOTION_TOKEN")
-DATABASE_ID = os.getenv("DATABASE_ID")
+# Después de load_dotenv para que estos módulos lean su configuración del .env
+from Catalogos import IPS, SITIOS, TIPOS_PETICION, USUARIOS, cargar_catalogos
+from Cola import COLUMNAS_ESPERA, TAMANO_PAGINA, cola, indice_cola
+from Conexion import obtener_conexion
+from Directorio import directorio
+from Notion import PROPIEDAD_FOLIO, obtener_outbox
 
-# Llamamos los headers
-headers_notion = {
-    "Authorization": "Bearer " + NOTION_TOKEN,
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28",
-}
-
-# Función para crear página en Notion
-def create_page_notion(data: dict):
-    """
-    data: diccionario con las propiedades que coincidan con los nombres y tipos de columnas en Notion.
-    Por ejemplo:
-    data = {
-        "Title": {"title": [{"text": {"content": "Mi título"}}]},
-        "URL": {"rich_text": [{"text": {"content": "https://ejemplo.com"}}]},
-        "Published": {"date": {"start": "2025-08-19T12:00:00+00:00"}}
-    }
-    """
-    create_url = "https://api.notion.com/v1/pages"
-    payload = {
-        "parent": {"database_id": DATABASE_ID},
-        "properties": data
-    }
+logger = logging.getLogger(__name__)
 
-    res = requests.post(create_url, headers=headers_notion, json=payload)
-
-    if res.status_code != 200 and res.status_code != 201:
-        print("Error al guardar en Notion:", res.json())
-    return res
 # Dentro de tu callback mostrar_resumen, después de guardar en DB MySQL
 def guardar_en_notion(correo, peticion, verticales, sitios, ips, descripcion,
-                      fecha_inicio, fecha_final, fecha_peticion):
+                      fecha_inicio, fecha_final, fecha_peticion, folio=None, plazo=None):
 
     # Construir datos en el esquema de Notion
     data_notion = {
@@ -61,104 +41,188 @@ def guardar_en_notion(correo, peticion, verticales, sitios, ips, descripcion,
         "Descripcion": {"rich_text": [{"text": {"content": descripcion}}]},
         "Estado": {"status": {"name": "Sin empezar"}}
     }
+    # Con el folio, Sincronizacion.py encuentra la fila de MySQL de esta página
+    if folio and PROPIEDAD_FOLIO:
+        data_notion[PROPIEDAD_FOLIO] = {"rich_text": [{"text": {"content": folio}}]}
 
-    res = create_page_notion(data_notion)
-    if res.status_code != 200 and res.status_code != 201:
-        print("Error al guardar en Notion:", res.text)
-    return res
-
-def obtener_id_unico(cursor, tabla, campo, valor):
-    cursor.execute(f"SELECT id_{tabla} FROM {tabla} WHERE {campo} = %s", (valor,))
-    res = cursor.fetchone()
-    if res:
-        return res[0]
-    else:
-        cursor.execute(f"INSERT INTO {tabla} ({campo}) VALUES (%s)", (valor,))
-        return cursor.lastrowid
+    # La página se crea en segundo plano desde la cola local (ver Notion.OutboxNotion)
+    if plazo is None:
+        return obtener_outbox().encolar(data_notion)
+    return obtener_outbox().encolar(data_notion, plazo.confirmar)
 
 def obtener_id_usuario(cursor, nombre_usuario):
-    # Buscar id en Usuarios_unicos
-    cursor.execute("SELECT id_usuarios_unicos FROM Usuarios_unicos WHERE nombre_usuarios_unicos = %s", (nombre_usuario,))
-    res = cursor.fetchone()
-    if res:
-        id_unico = res[0]
-    else:
-        cursor.execute("INSERT INTO Usuarios_unicos (nombre_usuarios_unicos) VALUES (%s)", (nombre_usuario,))
-        id_unico = cursor.lastrowid
-
-    # Buscar id_usuario en Usuarios
-    cursor.execute("SELECT id_usuarios FROM Usuarios WHERE id_usuarios_unicos = %s", (id_unico,))
-    res = cursor.fetchone()
-    if res:
-        return res[0]
-    else:
-        # Insertar nuevo usuario con ese id_usuarios_unicos y nombre_usuarios igual a nombre_usuario
-        cursor.execute("INSERT INTO Usuarios (id_usuarios_unicos, nombre_usuarios) VALUES (%s, %s)", (id_unico, nombre_usuario))
-        return cursor.lastrowid
-
-def guardar_peticion_db(correo, peticion, verticales, sitios, ips, descripcion, fecha_inicio, fecha_final, fecha_peticion):
+    # Los usuarios conocidos salen del catálogo sin tocar la base de datos
+    id_usuario = USUARIOS.id(cursor, nombre_usuario)
+    if id_usuario is not None:
+        return id_usuario
+
+    # Upsert: inserta o, si ya existe, devuelve su id en lastrowid (requiere las claves únicas
+    # de migraciones/001_claves_unicas_catalogos.sql)
+    cursor.execute(
+        """
+        INSERT INTO Usuarios_unicos (nombre_usuarios_unicos) VALUES (%s)
+        ON DUPLICATE KEY UPDATE id_usuarios_unicos = LAST_INSERT_ID(id_usuarios_unicos)
+        """,
+        (nombre_usuario,)
+    )
+    id_unico = cursor.lastrowid
+    cursor.execute(
+        """
+        INSERT INTO Usuarios (id_usuarios_unicos, nombre_usuarios) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE id_usuarios = LAST_INSERT_ID(id_usuarios)
+        """,
+        (id_unico, nombre_usuario)
+    )
+    return cursor.lastrowid
+
+def guardar_peticion_db(correo, peticion, verticales, sitios, ips, descripcion, fecha_inicio, fecha_final, fecha_peticion,
+                        folio=None, plazo=None):
     try:
-        conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-            port=int(os.getenv("DB_PORT"))
-        )
-        cursor = conn.cursor()
+        with obtener_conexion() as conn:
+            cursor = conn.cursor()
 
-        # Obtener id_usuario
-        id_usuario = obtener_id_usuario(cursor, correo)
+            # Obtener id_usuario
+            id_usuario = obtener_id_usuario(cursor, correo)
 
-        # Obtener id_tipo_peticion
-        cursor.execute("SELECT id_tipo_peticion FROM Tipo_peticion WHERE nombre_peticion = %s", (peticion,))
-        res = cursor.fetchone()
-        if not res:
-            raise Exception(f"Tipo_peticion '{peticion}' no encontrado.")
-        id_tipo_peticion = res[0]
+            # Obtener id_tipo_peticion
+            id_tipo_peticion = TIPOS_PETICION.id(cursor, peticion)
+            if id_tipo_peticion is None:
+                raise Exception(f"Tipo_peticion '{peticion}' no encontrado.")
 
 
-        cursor.execute(
-            """
-            INSERT INTO Peticion (id_tipo_peticion, id_usuarios, Descripción, fecha_petición, fecha_inicio, fecha_final)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """,
-            (id_tipo_peticion, id_usuario, descripcion, fecha_peticion, fecha_inicio, fecha_final)
-        )
-        conn.commit()
-        id_peticion = cursor.lastrowid
-
-        # Relación con sitios
-        for sitio in sitios:
-            cursor.execute("SELECT id FROM Sitios WHERE nombre_sitio = %s", (sitio,))
-            res_sitio = cursor.fetchone()
-            if res_sitio:
-                id_sitio = res_sitio[0]
-                cursor.execute("INSERT INTO Peticion_Sitios (id_peticion, id_sitios) VALUES (%s, %s)", (id_peticion, id_sitio))
-
-        # Relación con múltiples IPs
-        for ip in ips:
-            cursor.execute("SELECT id_ip FROM IP WHERE nombre_ip = %s", (ip,))
-            res_ip = cursor.fetchone()
-            if res_ip:
-                id_ip = res_ip[0]
-                cursor.execute("INSERT INTO Peticion_IP (id_ip, id_peticion) VALUES (%s, %s)", (id_ip, id_peticion))
-
-        conn.commit()
-        cursor.close()
-        conn.close()
+            cursor.execute(
+                """
+                INSERT INTO Peticion (id_tipo_peticion, id_usuarios, Descripción, fecha_petición, fecha_inicio, fecha_final,
+                                      folio)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """,
+                (id_tipo_peticion, id_usuario, descripcion, fecha_peticion, fecha_inicio, fecha_final, folio)
+            )
+            id_peticion = cursor.lastrowid
 
+            # Relación con sitios e IPs: ids desde los catálogos y un solo INSERT por tabla
+            ids_sitios = SITIOS.ids(cursor, sitios)
+            cursor.executemany(
+                "INSERT INTO Peticion_Sitios (id_peticion, id_sitios) VALUES (%s, %s)",
+                [(id_peticion, ids_sitios[sitio]) for sitio in sitios if sitio in ids_sitios]
+            )
+
+            ids_ips = IPS.ids(cursor, ips)
+            cursor.executemany(
+                "INSERT INTO Peticion_IP (id_ip, id_peticion) VALUES (%s, %s)",
+                [(ids_ips[ip], id_peticion) for ip in ips if ip in ids_ips]
+            )
+
+            # Todo en una sola transacción: si algo falla (o venció el plazo), el pool deshace
+            # la petición completa
+            with plazo.confirmar() if plazo is not None else nullcontext():
+                conn.commit()
+                # Solo después del commit: un id de una transacción deshecha no debe quedar
+                # cacheado. La cola cambió: la tabla y el contador deben mostrar la nueva petición
+                USUARIOS.agregar(correo, id_usuario)
+                indice_cola.agregar(id_peticion, fecha_peticion, cola.invalidar())
+            cursor.close()
         return id_peticion
 
-    except Exception as e:
-        print("Error al guardar en la base de datos:", e)
+    except Exception:
+        logger.exception("Error al guardar la petición en la base de datos")
         return None
 
 
-# Cargar los correos desde archivo Excel
-slack_path = os.getenv("SLACK")
-df_emails = pd.read_excel(slack_path) #Asegurarse de cambiar constantemente la hoja para actualizar los correos
-EMAILS = df_emails['email'].dropna().unique().tolist()
+# Hilos para guardar cada solicitud en sus destinos en paralelo; cada destino tiene su timeout
+ejecutor_destinos = ThreadPoolExecutor(max_workers=int(os.getenv("DESTINOS_HILOS", "8")),
+                                       thread_name_prefix="destinos")
+TIMEOUT_DESTINOS = {
+    "MySQL": float(os.getenv("TIMEOUT_MYSQL", "10")),
+    "Notion": float(os.getenv("TIMEOUT_NOTION", "5")),
+}
+
+
+class PlazoDestino:
+    """
+    Árbitro entre la confirmación de un destino y el vencimiento de su timeout: gana lo que
+    ocurra primero.
+
+    El destino confirma su escritura dentro de `confirmar()`, que lanza TimeoutError (y la
+    escritura se deshace) si el plazo ya venció. `cancelar()` espera a que termine una
+    confirmación en curso y devuelve True si el destino ya no guardará nada, o False si llegó a
+    confirmar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelado = False
+        self._confirmado = False
+
+    @contextmanager
+    def confirmar(self):
+        with self._lock:
+            if self._cancelado:
+                raise TimeoutError("el plazo del destino venció antes de confirmar")
+            yield
+            self._confirmado = True
+
+    def cancelar(self) -> bool:
+        with self._lock:
+            self._cancelado = not self._confirmado
+            return self._cancelado
+
+
+def guardar_en_destinos(**solicitud):
+    """
+    Guarda la solicitud en MySQL y en la cola de Notion a la vez, así la espera es la del
+    destino más lento y no la suma. Devuelve ({destino: (estado, detalle)}, id_peticion) con
+    estado 'ok', 'error' o 'timeout' e id_peticion None si no se guardó en MySQL.
+
+    Al vencer el timeout de un destino se cancela su `PlazoDestino`: si aún no había
+    confirmado, su escritura se deshace y queda 'timeout' (en ese destino no se guardó nada);
+    si estaba confirmando, se espera a que termine y se informa su resultado.
+    """
+    inicio = time.monotonic()
+    plazos = {destino: PlazoDestino() for destino in TIMEOUT_DESTINOS}
+    futuros = {
+        ejecutor_destinos.submit(guardar_peticion_db, plazo=plazos["MySQL"], **solicitud): "MySQL",
+        ejecutor_destinos.submit(guardar_en_notion, plazo=plazos["Notion"], **solicitud): "Notion",
+    }
+    estados = {}
+    id_peticion = None
+    pendientes = set(futuros)
+    while pendientes:
+        limite = min(inicio + TIMEOUT_DESTINOS[futuros[f]] for f in pendientes)
+        listos, pendientes = wait(pendientes, timeout=max(0.0, limite - time.monotonic()),
+                                  return_when=FIRST_COMPLETED)
+
+        vencidos = {f for f in pendientes if time.monotonic() >= inicio + TIMEOUT_DESTINOS[futuros[f]]}
+        pendientes -= vencidos
+        for futuro in vencidos:
+            destino = futuros[futuro]
+            if plazos[destino].cancelar():
+                estados[destino] = ("timeout", f"sin respuesta en {TIMEOUT_DESTINOS[destino]:g} s; no se guardó")
+            else:
+                # Ya confirmó: solo falta que su hilo termine de devolver el resultado
+                wait([futuro])
+                listos.add(futuro)
+
+        for futuro in listos:
+            destino = futuros[futuro]
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                logger.exception("Error al guardar la petición en %s", destino)
+                estados[destino] = ("error", f"error: {e}")
+                continue
+            if resultado is None:
+                estados[destino] = ("error", "no se pudo guardar")
+            elif destino == "MySQL":
+                id_peticion = resultado
+                estados[destino] = ("ok", f"guardada con id {resultado}")
+            else:
+                estados[destino] = ("ok", "en cola para crear la página")
+    return {destino: estados[destino] for destino in TIMEOUT_DESTINOS}, id_peticion
+
+
+# Los correos se buscan en el directorio compilado del Excel de SLACK (ver Directorio.py), no se
+# mandan todos en el layout. Actualizar el Excel basta: el directorio se recompila solo
 
 
 tipos_peticion = ['Audiencia', 'Comparación', 'Competencia', 'Benchmark', 'Comscore', 'Histórico', 'Demográfico']
@@ -181,36 +245,29 @@ IPs = ["GLOBAL", "LATAM", "México", "Colombia", "Perú", "Argentina"
     , "Chile"]
 
 
+def posicion_en_cola(id_peticion):
+    """(posición empezando en 1, total de pendientes) o None si no está pendiente o falla la consulta."""
+    try:
+        return indice_cola.posicion(id_peticion)
+    except Exception:
+        logger.exception("Error al obtener la posición de la petición %s en la cola", id_peticion)
+        return None
+
+
 def contar_peticiones_no_finalizadas():
     try:
-        conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-            port=int(os.getenv("DB_PORT"))
-        )
-        cursor = conn.cursor()
-
-        # Cuenta todas las peticiones cuyo estado no sea 'Finalizada' o que sea NULL
-        cursor.execute("""
-                       SELECT COUNT(*)
-                       FROM Peticion
-                       WHERE estado_petición IS NULL
-                          OR estado_petición != 'Finalizada'
-                       """)
-
-        resultado = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return resultado[0] if resultado else 0
-
-    except Exception as e:
-        print("Error al contar peticiones no finalizadas:", e)
+        # Misma foto que la primera página de la tabla de espera: ambos números coinciden
+        return cola.contar()
+
+    except Exception:
+        logger.exception("Error al contar las peticiones no finalizadas")
         return 0
 
 
-app = Dash(__name__, external_stylesheets=[dbc.themes.SUPERHERO])
+# Ruta pública de la app; wsgi.py la monta en /form/ junto al dashboard
+PREFIJO = os.getenv("FORM_PREFIJO", "/")
+
+app = Dash(__name__, external_stylesheets=[dbc.themes.SUPERHERO], requests_pathname_prefix=PREFIJO)
 
 
 def create_tab1_layout(form=None) -> dbc.Container:
@@ -274,7 +331,8 @@ def create_tab1_layout(form=None) -> dbc.Container:
                 dcc.Dropdown(
                     id="email",
                     placeholder="Escribe tu correo…",
-                    options=[{"label": e, "value": e} for e in EMAILS],
+                    # Las opciones llegan del servidor según lo que se escribe (buscar_correos)
+                    options=[],
                     searchable=True,
                     clearable=True,
                     style={
@@ -401,8 +459,13 @@ def create_tab1_layout(form=None) -> dbc.Container:
                                'boxShadow': '0 0 10px #00ffea'
                            })
                 ,
+                # Visible mientras se guarda la solicitud
+                dbc.Progress(id='progreso-envio', value=100, striped=True, animated=True,
+                             label="Guardando la solicitud...", style={'display': 'none'}),
 
                 html.Div(id='output-resumen', style={'marginTop': '20px', 'fontWeight': 'bold'}),
+                # id de la última petición guardada, para calcular su posición en la cola
+                dcc.Store(id='id-peticion-enviada'),
 
                 html.Br(),
 
@@ -429,85 +492,87 @@ def create_tab1_layout(form=None) -> dbc.Container:
         dcc.Loading(
             id="loading-tabla-espera",
             children=[
-                html.Div(id="tabla-espera")
+                html.Div(id="tabla-espera"),
+                # Oculta hasta el primer envío; cada página se pide al servidor
+                html.Div(crear_tabla_espera(), id="contenedor-tabla-espera", hidden=True)
             ],
             type="default"
         ),
 
     ], fluid=True)
 
-def obtener_peticiones_en_espera():
+def obtener_peticiones_en_espera(pagina=0, tamano=TAMANO_PAGINA, sort_by=None, filter_query=None):
+    """Una página de peticiones pendientes y el total de filas que cumplen el filtro."""
     try:
-        conn = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-            port=int(os.getenv("DB_PORT"))
-        )
-        query = """
-        SELECT
-            uu.nombre_usuarios_unicos AS usuario,
-            tp.nombre_peticion AS tipo_peticion,
-            p.fecha_petición,
-            p.Descripción,
-            p.estado_petición
-        FROM Peticion p
-        JOIN Usuarios u ON p.id_usuarios = u.id_usuarios
-        JOIN Usuarios_unicos uu ON u.id_usuarios_unicos = uu.id_usuarios_unicos
-        JOIN Tipo_peticion tp ON p.id_tipo_peticion = tp.id_tipo_peticion
-        JOIN Peticion_Sitios ps ON p.id_peticion = ps.id_peticion
-        JOIN Sitios s ON ps.id_sitios = s.id
-        JOIN Verticales v ON s.id_vertical = v.id
-        JOIN Peticion_IP pip ON p.id_peticion = pip.id_peticion
-        JOIN IP ip ON pip.id_ip = ip.id_ip
-        WHERE estado_petición IS NULL OR estado_petición != 'Finalizada'
-        ORDER BY p.fecha_petición DESC
-        """
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df
-    except Exception as e:
-        print("Error al obtener las peticiones:", e)
-        return pd.DataFrame()
-
-
+        return cola.pagina(pagina, tamano, sort_by, filter_query)
+    except Exception:
+        logger.exception("Error al obtener las peticiones en espera")
+        return [], 0
+
+
+def crear_tabla_espera() -> dash_table.DataTable:
+    """Tabla de peticiones en espera con paginación, orden y filtros resueltos en SQL."""
+    return dash_table.DataTable(
+        id='tabla-peticiones',
+        columns=[{"name": i, "id": i} for i in COLUMNAS_ESPERA],
+        data=[],
+        page_current=0,
+        page_size=TAMANO_PAGINA,
+        page_action='custom',
+        sort_action='custom',
+        sort_mode='multi',
+        sort_by=[],
+        filter_action='custom',
+        filter_query='',
+        style_table={'overflowX': 'auto'},
+        style_cell={
+            'textAlign': 'left',
+            'fontFamily': 'Arial',
+            'padding': '5px',
+            'minWidth': '100px',
+            'whiteSpace': 'normal'
+        },
+        style_header={
+            'backgroundColor': '#f2f2f2',
+            'fontWeight': 'bold'
+        },
+        style_data_conditional=[
+            {
+                'if': {'row_index': 'odd'},
+                'backgroundColor': '#fafafa'
+            }
+        ]
+    )
 
 
 def register_tabform_callbacks(app):
     @app.callback(
+        Output('tabla-peticiones', 'data'),
+        Output('tabla-peticiones', 'page_count'),
+        Output('contenedor-tabla-espera', 'hidden'),
         Output('tabla-espera', 'children'),
-        Input('boton-enviar', 'n_clicks'),
+        # Se actualiza cuando termina el envío (output-resumen), así ya incluye la nueva petición
+        Input('output-resumen', 'children'),
+        Input('tabla-peticiones', 'page_current'),
+        Input('tabla-peticiones', 'page_size'),
+        Input('tabla-peticiones', 'sort_by'),
+        Input('tabla-peticiones', 'filter_query'),
+        State('boton-enviar', 'n_clicks'),
         prevent_initial_call=True
     )
-    def mostrar_tabla_espera(n_clicks):
-        df = obtener_peticiones_en_espera()
-        if df.empty:
-            return dbc.Alert("No hay peticiones en espera.", color="secondary")
-
-        return dash_table.DataTable(
-            columns=[{"name": i, "id": i} for i in df.columns],
-            data=df.to_dict('records'),
-            #page_size=50,
-            style_table={'overflowX': 'auto'},
-            style_cell={
-                'textAlign': 'left',
-                'fontFamily': 'Arial',
-                'padding': '5px',
-                'minWidth': '100px',
-                'whiteSpace': 'normal'
-            },
-            style_header={
-                'backgroundColor': '#f2f2f2',
-                'fontWeight': 'bold'
-            },
-            style_data_conditional=[
-                {
-                    'if': {'row_index': 'odd'},
-                    'backgroundColor': '#fafafa'
-                }
-            ]
-        )
+    # Sale de las fotos de SnapshotCola: casi nunca consulta MySQL y, cuando lo hace, usa una
+    # conexión del pool
+    def mostrar_tabla_espera(resumen, page_current, page_size, sort_by, filter_query, n_clicks):
+        # La tabla aparece después del primer envío; antes no hay nada que consultar
+        if not n_clicks:
+            raise PreventUpdate
+
+        page_size = page_size or TAMANO_PAGINA
+        filas, total = obtener_peticiones_en_espera(page_current or 0, page_size, sort_by, filter_query)
+        if total == 0 and not filter_query:
+            return [], 0, True, dbc.Alert("No hay peticiones en espera.", color="secondary")
+
+        return filas, max(1, math.ceil(total / page_size)), False, None
 
     @app.callback(
         Output('contenedor-fechas', 'hidden'),
@@ -583,6 +648,22 @@ def register_tabform_callbacks(app):
                 opciones = [{'label': sitio, 'value': sitio} for sitio in sitios]
                 return opciones, sitios, True, opciones_ip
 
+    # Callback: opciones del correo según lo que se escribe
+    @app.callback(
+        Output('email', 'options'),
+        Input('email', 'search_value'),
+        State('email', 'value')
+    )
+    def buscar_correos(search_value, value):
+        if not search_value:
+            raise PreventUpdate
+
+        correos = directorio.buscar(search_value) if directorio else []
+        # El correo ya elegido debe seguir en las opciones o el Dropdown lo borra
+        if value and value not in correos:
+            correos = [value] + correos
+        return [{"label": e, "value": e} for e in correos]
+
     # Callback: validar IPs
     @app.callback(
         Output('dropdown-ip', 'value'),
@@ -609,8 +690,9 @@ def register_tabform_callbacks(app):
         return ips_seleccionadas, ''
 
     # Callback: mostrar resumen
-    @callback(
+    @app.callback(
         Output('output-resumen', 'children'),
+        Output('id-peticion-enviada', 'data'),
         Input('boton-enviar', 'n_clicks'),
         State('email', 'value'),  # 1. correo
         State('dropdown-peticion', 'value'),  # 2. peticion
@@ -621,13 +703,18 @@ def register_tabform_callbacks(app):
         State('input-fecha-inicio', 'value'),  # 7. fecha_inicio
         State('input-fecha-fin', 'value'),  # 8. fecha_fin
         State('my-date-picker-range', 'start_date'),  # 9. fecha_hist_inicio
-        State('my-date-picker-range', 'end_date')  # 10. fecha_hist_fin
+        State('my-date-picker-range', 'end_date'),  # 10. fecha_hist_fin
+        # Mientras se guarda, el botón no admite un segundo envío
+        running=[
+            (Output('boton-enviar', 'disabled'), True, False),
+            (Output('progreso-envio', 'style'), {'marginTop': '15px', 'height': '20px'}, {'display': 'none'}),
+        ],
     )
     def mostrar_resumen(n_clicks, correo, peticion, verticales, sitios, ips, descripcion,
                         fecha_inicio, fecha_fin, fecha_hist_inicio, fecha_hist_fin):
 
         if n_clicks == 0:
-            return ''
+            return '', no_update
 
         if not peticion or not verticales or not sitios or not ips or not descripcion or not correo:
             ejemplo = (
@@ -650,7 +737,7 @@ def register_tabform_callbacks(app):
                 ],
                 color="danger",
                 dismissable=True
-            )
+            ), no_update
 
         # Inicializar fechas
         fecha_inicio_resumen = ""
@@ -665,7 +752,7 @@ def register_tabform_callbacks(app):
                     ],
                     color="danger",
                     dismissable=True
-                )
+                ), no_update
             try:
                 fecha_hist_inicio_dt = datetime.strptime(fecha_hist_inicio, "%Y-%m-%d")
                 fecha_hist_fin_dt = datetime.strptime(fecha_hist_fin, "%Y-%m-%d")
@@ -679,7 +766,7 @@ def register_tabform_callbacks(app):
                     ],
                     color="danger",
                     dismissable=True
-                )
+                ), no_update
 
         elif peticion == 'Comparación':
             if not fecha_inicio or not fecha_fin:
@@ -690,7 +777,7 @@ def register_tabform_callbacks(app):
                     ],
                     color="danger",
                     dismissable=True
-                )
+                ), no_update
             try:
                 fecha_inicio_dt = datetime.strptime(fecha_inicio, "%m/%Y")
                 fecha_fin_dt = datetime.strptime(fecha_fin, "%m/%Y")
@@ -706,7 +793,7 @@ def register_tabform_callbacks(app):
                         ],
                         color="danger",
                         dismissable=True
-                    )
+                    ), no_update
 
                 if fecha_inicio_dt > fecha_max or fecha_fin_dt > fecha_max:
                     return dbc.Alert(
@@ -716,7 +803,7 @@ def register_tabform_callbacks(app):
                         ],
                         color="danger",
                         dismissable=True
-                    )
+                    ), no_update
 
                 fecha_inicio_resumen = fecha_inicio_dt.strftime('%Y-%m-01')
                 if fecha_fin_dt.month == 12:
@@ -734,7 +821,7 @@ def register_tabform_callbacks(app):
                     ],
                     color="danger",
                     dismissable=True
-                )
+                ), no_update
 
         else:
             hoy = datetime.today()
@@ -746,9 +833,10 @@ def register_tabform_callbacks(app):
 
         # Fecha actual de la petición (nueva línea)
         fecha_peticion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # Identifica la petición en MySQL y en Notion (ver migraciones/003_folio_sincronizacion.sql)
+        folio = str(uuid.uuid4())
 
-
-        guardar_peticion_db(
+        estados, id_peticion = guardar_en_destinos(
             correo=correo,
             peticion=peticion,
             verticales=verticales,
@@ -757,20 +845,10 @@ def register_tabform_callbacks(app):
             descripcion=descripcion,
             fecha_inicio=fecha_inicio_resumen,
             fecha_final=fecha_fin_resumen,
-            fecha_peticion=fecha_peticion
-        )
-
-        guardar_en_notion(
-            correo=correo,
-            peticion=peticion,
-            verticales=verticales,
-            sitios=sitios,
-            ips=ips,
-            descripcion=descripcion,
-            fecha_inicio=fecha_inicio_resumen,
-            fecha_final=fecha_fin_resumen,
-            fecha_peticion=fecha_peticion
+            fecha_peticion=fecha_peticion,
+            folio=folio
         )
+        todo_ok = all(estado == "ok" for estado, _ in estados.values())
 
         return dbc.Alert(
             [
@@ -785,30 +863,49 @@ def register_tabform_callbacks(app):
                     html.Li(f"Fecha de inicio: {fecha_inicio_resumen}"),
                     html.Li(f"Fecha final: {fecha_fin_resumen}"),
                     html.Li(f"Fecha de la petición: {fecha_peticion}"),
+                    html.Li(f"Folio: {folio}"),
                     html.Li(f"Descripción: {descripcion}")
-                ])
+                ]),
+                html.Span("Estado del registro:"),
+                html.Ul([html.Li(f"{destino}: {detalle}") for destino, (_, detalle) in estados.items()])
             ],
-            color="success",
+            color="success" if todo_ok else "warning",
             dismissable=True
-        )
+        ), id_peticion
 
     @app.callback(
         Output('contador-finalizadas', 'children'),
-        Input('boton-enviar', 'n_clicks'),
+        Input('id-peticion-enviada', 'data'),
+        State('boton-enviar', 'n_clicks'),
         prevent_initial_call=True
     )
-    def actualizar_contador_no_finalizadas(n_clicks):
+    def actualizar_contador_no_finalizadas(id_peticion, n_clicks):
         if not n_clicks:
             raise PreventUpdate
 
-        en_espera = contar_peticiones_no_finalizadas()
-        return f"Tu solicitud está detrás de {en_espera} peticiones aún no finalizadas. Mira la tabla debajo para ver de cuáles se tratan."
+        posicion = posicion_en_cola(id_peticion) if id_peticion is not None else None
+        if posicion is None:
+            en_espera = contar_peticiones_no_finalizadas()
+            return f"Tu solicitud está detrás de {en_espera} peticiones aún no finalizadas. Mira la tabla debajo para ver de cuáles se tratan."
+        lugar, pendientes = posicion
+        return f"Tu solicitud está detrás de {lugar - 1} de las {pendientes} peticiones aún no finalizadas. Mira la tabla debajo para ver de cuáles se tratan."
+
+    # Posición de una petición en la cola, para consultarla periódicamente
+    @app.server.route('/api/cola/<int:id_peticion>')
+    def api_posicion_en_cola(id_peticion):
+        posicion = posicion_en_cola(id_peticion)
+        if posicion is None:
+            return jsonify({"id_peticion": id_peticion, "pendiente": False}), 404
+        lugar, pendientes = posicion
+        return jsonify({"id_peticion": id_peticion, "pendiente": True, "posicion": lugar,
+                        "delante": lugar - 1, "pendientes": pendientes})
 
 
 app.layout = create_tab1_layout()
+# Los callbacks se registran al importar, así wsgi.py sirve la misma app que `python Form.py`
+register_tabform_callbacks(app)
 
 if __name__ == '__main__':
-    app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-    app.layout = create_tab1_layout()
-    register_tabform_callbacks(app)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    cargar_catalogos()
     app.run(debug=True, port=8051)
\ No newline at end of file
@@ -0,0 +1,397 @@
+"""
+Importación masiva de peticiones históricas (CSV o Excel) a MySQL.
+
+    python Importar.py historico.csv
+    python Importar.py historico.xlsx --hoja Peticiones --formato-fecha "%d/%m/%Y %H:%M"
+
+Columnas (sin importar mayúsculas, acentos ni espacios): correo, peticion, fecha_peticion y,
+opcionales, sitios, ips (separados por comas), descripcion, fecha_inicio, fecha_final y
+estado. Sin columna de estado, o con la celda vacía, se usa --estado (por defecto
+'Finalizada', para que el histórico no entre en la cola de espera).
+
+El archivo se lee por lotes; cada lote resuelve usuarios, tipos, sitios e IPs con unas pocas
+consultas por conjunto y se inserta en una transacción. Después de cada lote se guarda un
+punto de control junto al archivo (<archivo>.importacion.json): si la importación se corta,
+la siguiente ejecución sigue desde ahí. Cada fila lleva un folio derivado del nombre del
+archivo, su número de fila y su contenido, así que repetir un lote (o el archivo entero) no
+duplica peticiones, y dos peticiones idénticas en filas distintas se importan las dos. Las
+filas que no se pueden importar van a <archivo>.rechazadas.csv con el motivo.
+"""
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+import unicodedata
+import uuid
+from datetime import date
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Después de load_dotenv para que estos módulos lean su configuración del .env
+from Catalogos import IPS, SITIOS, TIPOS_PETICION, USUARIOS
+from Cola import cola
+from Conexion import obtener_conexion
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = int(os.getenv("IMPORTAR_LOTE", "1000"))
+ESTADO_POR_DEFECTO = "Finalizada"
+# Espacio de nombres de los folios de importación (UUID5 del origen y el contenido de la fila)
+NAMESPACE_FOLIO = uuid.uuid5(uuid.NAMESPACE_URL, "DataNoob/Peticion")
+
+# Columna normalizada → nombres aceptados en el archivo (ya normalizados, ver `_normalizar`)
+ALIAS_COLUMNAS = {
+    "correo": ["correo", "email", "usuario"],
+    "peticion": ["peticion", "tipo_peticion", "tipo_de_peticion", "tipo"],
+    "sitios": ["sitios", "sitio"],
+    "ips": ["ips", "ip", "region_ip"],
+    "descripcion": ["descripcion"],
+    "fecha_peticion": ["fecha_peticion", "fecha"],
+    "fecha_inicio": ["fecha_inicio"],
+    "fecha_final": ["fecha_final", "fecha_fin"],
+    "estado": ["estado", "estado_peticion"],
+}
+OBLIGATORIAS = ["correo", "peticion", "fecha_peticion"]
+
+
+def _normalizar(nombre) -> str:
+    sin_acentos = unicodedata.normalize("NFKD", str(nombre)).encode("ascii", "ignore").decode()
+    return "_".join(sin_acentos.strip().lower().split())
+
+
+def _columnas(encabezado) -> dict:
+    """Columna del archivo que corresponde a cada columna normalizada presente."""
+    por_nombre = {_normalizar(columna): columna for columna in encabezado}
+    columnas = {}
+    for destino, alias in ALIAS_COLUMNAS.items():
+        for nombre in alias:
+            if nombre in por_nombre:
+                columnas[destino] = por_nombre[nombre]
+                break
+    faltan = [columna for columna in OBLIGATORIAS if columna not in columnas]
+    if faltan:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltan)}")
+    return columnas
+
+
+def _texto(valor) -> str:
+    return "" if valor is None or (isinstance(valor, float) and pd.isna(valor)) else str(valor).strip()
+
+
+def _lista(valor) -> list:
+    return list(dict.fromkeys(parte.strip() for parte in _texto(valor).split(",") if parte.strip()))
+
+
+def folio_fila(origen, numero, correo, peticion, fecha_peticion, descripcion) -> str:
+    """
+    Folio determinista: la misma fila del mismo archivo produce siempre el mismo folio. El
+    origen y el número de fila entran en la clave para que dos peticiones reales con el mismo
+    contenido no se confundan y la segunda se descarte como ya importada.
+    """
+    clave = [origen, numero, correo, peticion, str(fecha_peticion), descripcion]
+    return str(uuid.uuid5(NAMESPACE_FOLIO, json.dumps(clave)))
+
+
+def interpretar_fechas(valores: pd.Series, formato_fecha: str = None) -> pd.Series:
+    """
+    Fechas de una columna; lo que no se puede interpretar queda como NaT.
+
+    Sin `formato_fecha` cada celda se interpreta por separado (format="mixed"): pandas, si no,
+    deduce el formato de la primera fila y rechaza las demás, así que el resultado dependería
+    de cómo caen los lotes. Las celdas de fecha de Excel llegan como datetime y se respetan.
+
+    >>> interpretar_fechas(pd.Series(["2024-01-05 10:00", "2024-01-06", "", "mañana"])).tolist()
+    [Timestamp('2024-01-05 10:00:00'), Timestamp('2024-01-06 00:00:00'), NaT, NaT]
+    >>> interpretar_fechas(pd.Series(["05/01/2024 10:00", "06/01/2024"]), "%d/%m/%Y %H:%M").tolist()
+    [Timestamp('2024-01-05 10:00:00'), NaT]
+    """
+    valores = valores.map(lambda v: v if isinstance(v, date) else (_texto(v) or None))
+    return pd.to_datetime(valores, format=formato_fecha or "mixed", errors="coerce")
+
+
+def _es_excel(ruta):
+    return ruta.lower().endswith((".xlsx", ".xlsm"))
+
+
+def leer_lotes(ruta: str, tamano: int = TAMANO_LOTE, saltar: int = 0, hoja: str = None):
+    """
+    Recorre el archivo en lotes de `tamano` filas, sin cargarlo completo. Devuelve pares
+    (índice de la primera fila del lote, DataFrame); las primeras `saltar` filas se omiten.
+    """
+    if not _es_excel(ruta):
+        lector = pd.read_csv(ruta, dtype=str, keep_default_na=False, chunksize=tamano,
+                             skiprows=range(1, saltar + 1))
+        inicio = saltar
+        for df in lector:
+            yield inicio, df
+            inicio += len(df)
+        return
+
+    # Excel no se puede leer por partes con pandas: openpyxl en modo solo lectura va fila por fila
+    import openpyxl
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = (libro[hoja] if hoja else libro.active).iter_rows(values_only=True)
+        encabezado = [_texto(celda) for celda in next(filas)]
+        for _ in itertools.islice(filas, saltar):
+            pass
+        inicio = saltar
+        while True:
+            bloque = list(itertools.islice(filas, tamano))
+            if not bloque:
+                return
+            yield inicio, pd.DataFrame(bloque, columns=encabezado)
+            inicio += len(bloque)
+    finally:
+        libro.close()
+
+
+def preparar_lote(df: pd.DataFrame, inicio: int, origen: str, estado_por_defecto: str = ESTADO_POR_DEFECTO,
+                  formato_fecha: str = None):
+    """
+    Filas listas para insertar y filas rechazadas (número de fila, correo, motivo). `origen`
+    identifica el archivo (y la hoja) en los folios.
+    """
+    columnas = _columnas(df.columns)
+
+    def fechas(nombre):
+        if nombre not in columnas:
+            return pd.Series(pd.NaT, index=df.index)
+        return interpretar_fechas(df[columnas[nombre]], formato_fecha)
+
+    fecha_peticion = fechas("fecha_peticion")
+    fecha_inicio, fecha_final = fechas("fecha_inicio"), fechas("fecha_final")
+    filas, rechazadas = [], []
+    for posicion, (indice, registro) in enumerate(df.iterrows()):
+        numero = inicio + posicion + 1
+        valor = {nombre: registro[columna] for nombre, columna in columnas.items()}
+        correo, peticion = _texto(valor["correo"]), _texto(valor["peticion"])
+        if not correo or not peticion:
+            rechazadas.append((numero, correo, "sin correo o tipo de petición"))
+            continue
+        if pd.isna(fecha_peticion[indice]):
+            motivo = f"fecha de petición inválida: {_texto(valor['fecha_peticion'])!r}"
+            rechazadas.append((numero, correo, motivo))
+            continue
+        descripcion = _texto(valor.get("descripcion"))
+        filas.append({
+            "numero": numero,
+            "correo": correo,
+            "peticion": peticion,
+            "sitios": _lista(valor.get("sitios")),
+            "ips": _lista(valor.get("ips")),
+            "descripcion": descripcion,
+            "fecha_peticion": fecha_peticion[indice].to_pydatetime(),
+            "fecha_inicio": None if pd.isna(fecha_inicio[indice]) else fecha_inicio[indice].date(),
+            "fecha_final": None if pd.isna(fecha_final[indice]) else fecha_final[indice].date(),
+            "estado": _texto(valor.get("estado")) or estado_por_defecto,
+            "folio": folio_fila(origen, numero, correo, peticion, fecha_peticion[indice], descripcion),
+        })
+    return filas, rechazadas
+
+
+def _marcadores(n):
+    return ", ".join(["%s"] * n)
+
+
+def _ids_usuarios(cursor, correos) -> dict:
+    """Ids de Usuarios de todos los correos, creando los que falten con dos INSERT por conjunto."""
+    ids = USUARIOS.ids(cursor, correos)
+    nuevos = [correo for correo in correos if correo not in ids]
+    if not nuevos:
+        return ids
+
+    # INSERT IGNORE depende de las claves únicas de migraciones/001_claves_unicas_catalogos.sql
+    cursor.executemany("INSERT IGNORE INTO Usuarios_unicos (nombre_usuarios_unicos) VALUES (%s)",
+                       [(correo,) for correo in nuevos])
+    cursor.execute(
+        f"SELECT nombre_usuarios_unicos, id_usuarios_unicos FROM Usuarios_unicos "
+        f"WHERE nombre_usuarios_unicos IN ({_marcadores(len(nuevos))})",
+        nuevos,
+    )
+    unicos = dict(cursor.fetchall())
+    cursor.executemany("INSERT IGNORE INTO Usuarios (id_usuarios_unicos, nombre_usuarios) VALUES (%s, %s)",
+                       [(unicos[correo], correo) for correo in nuevos])
+    cursor.execute(
+        f"""
+        SELECT uu.nombre_usuarios_unicos, u.id_usuarios
+        FROM Usuarios u
+        JOIN Usuarios_unicos uu ON u.id_usuarios_unicos = uu.id_usuarios_unicos
+        WHERE uu.nombre_usuarios_unicos IN ({_marcadores(len(nuevos))})
+        """,
+        nuevos,
+    )
+    return {**ids, **dict(cursor.fetchall())}
+
+
+def importar_lote(filas: list):
+    """
+    Inserta un lote en una sola transacción. Devuelve (insertadas, ya existentes, rechazadas,
+    ids de usuarios creados).
+
+    executemany con INSERT ... VALUES se envía como INSERT de varias filas, así que el lote
+    cuesta un número fijo de sentencias y no 2N+6.
+    """
+    rechazadas = []
+    with obtener_conexion() as conn:
+        cursor = conn.cursor()
+        tipos = TIPOS_PETICION.ids(cursor, [fila["peticion"] for fila in filas])
+        sitios = SITIOS.ids(cursor, [sitio for fila in filas for sitio in fila["sitios"]])
+        ips = IPS.ids(cursor, [ip for fila in filas for ip in fila["ips"]])
+
+        validas = []
+        for fila in filas:
+            desconocidos = ([fila["peticion"]] if fila["peticion"] not in tipos else []) + \
+                           [sitio for sitio in fila["sitios"] if sitio not in sitios] + \
+                           [ip for ip in fila["ips"] if ip not in ips]
+            if desconocidos:
+                motivo = f"no existen en los catálogos: {', '.join(desconocidos)}"
+                rechazadas.append((fila["numero"], fila["correo"], motivo))
+            else:
+                validas.append(fila)
+
+        # Filas ya importadas (lote repetido tras un fallo, o el mismo archivo otra vez)
+        folios = list(dict.fromkeys(fila["folio"] for fila in validas))
+        existentes = set()
+        if folios:
+            cursor.execute(f"SELECT folio FROM Peticion WHERE folio IN ({_marcadores(len(folios))})", folios)
+            existentes = {folio for (folio,) in cursor.fetchall()}
+        vistos = set(existentes)
+        nuevas = []
+        for fila in validas:
+            if fila["folio"] not in vistos:
+                vistos.add(fila["folio"])
+                nuevas.append(fila)
+        if not nuevas:
+            cursor.close()
+            return 0, len(validas), rechazadas, {}
+
+        usuarios = _ids_usuarios(cursor, list(dict.fromkeys(fila["correo"] for fila in nuevas)))
+        cursor.executemany(
+            """
+            INSERT INTO Peticion (id_tipo_peticion, id_usuarios, Descripción, fecha_petición, fecha_inicio,
+                                  fecha_final, estado_petición, folio)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [(tipos[fila["peticion"]], usuarios[fila["correo"]], fila["descripcion"], fila["fecha_peticion"],
+              fila["fecha_inicio"], fila["fecha_final"], fila["estado"], fila["folio"]) for fila in nuevas],
+        )
+        # Los ids se leen por folio: con inserciones concurrentes no tienen por qué ser consecutivos
+        folios_nuevos = [fila["folio"] for fila in nuevas]
+        cursor.execute(
+            f"SELECT folio, id_peticion FROM Peticion WHERE folio IN ({_marcadores(len(folios_nuevos))})",
+            folios_nuevos,
+        )
+        ids_peticion = dict(cursor.fetchall())
+
+        relaciones_sitios = [(ids_peticion[fila["folio"]], sitios[sitio])
+                             for fila in nuevas for sitio in fila["sitios"]]
+        if relaciones_sitios:
+            cursor.executemany("INSERT INTO Peticion_Sitios (id_peticion, id_sitios) VALUES (%s, %s)",
+                               relaciones_sitios)
+        relaciones_ips = [(ips[ip], ids_peticion[fila["folio"]]) for fila in nuevas for ip in fila["ips"]]
+        if relaciones_ips:
+            cursor.executemany("INSERT INTO Peticion_IP (id_ip, id_peticion) VALUES (%s, %s)", relaciones_ips)
+
+        conn.commit()
+        cursor.close()
+    return len(nuevas), len(validas) - len(nuevas), rechazadas, usuarios
+
+
+def _firma(ruta):
+    estado = os.stat(ruta)
+    return [estado.st_mtime_ns, estado.st_size]
+
+
+def _leer_punto(ruta_punto):
+    try:
+        with open(ruta_punto, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _guardar_punto(ruta_punto, punto):
+    # Temporal y reemplazo: un corte a medio escribir no deja un punto de control roto
+    temporal = f"{ruta_punto}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(punto, f)
+    os.replace(temporal, ruta_punto)
+
+
+def importar(ruta: str, tamano: int = TAMANO_LOTE, hoja: str = None,
+             estado_por_defecto: str = ESTADO_POR_DEFECTO, formato_fecha: str = None,
+             reiniciar: bool = False) -> dict:
+    """Importa el archivo completo, retomando desde su punto de control si existe; devuelve el resumen."""
+    ruta_punto, ruta_rechazadas = f"{ruta}.importacion.json", f"{ruta}.rechazadas.csv"
+    punto = None if reiniciar else _leer_punto(ruta_punto)
+    if punto is not None and punto["firma"] != _firma(ruta):
+        raise RuntimeError(f"{ruta} cambió desde la importación anterior; usa --reiniciar para empezar "
+                           "de cero (las filas ya importadas que siguen en la misma fila se reconocen por "
+                           "su folio y no se duplican)")
+    if punto is None:
+        punto = {"firma": _firma(ruta), "filas": 0, "insertadas": 0, "existentes": 0, "rechazadas": 0}
+        if os.path.exists(ruta_rechazadas):
+            os.remove(ruta_rechazadas)
+    elif punto["filas"]:
+        logger.info("Retomando %s desde la fila %d", ruta, punto["filas"] + 1)
+
+    # Sin la carpeta: mover el archivo no cambia los folios de sus filas
+    origen = os.path.basename(ruta) if hoja is None else f"{os.path.basename(ruta)}#{hoja}"
+    inicio = time.perf_counter()
+    filas_sesion = 0
+    for primera, df in leer_lotes(ruta, tamano, punto["filas"], hoja):
+        filas, rechazadas = preparar_lote(df, primera, origen, estado_por_defecto, formato_fecha)
+        insertadas, existentes, rechazadas_db, usuarios = importar_lote(filas) if filas else (0, 0, [], {})
+        rechazadas += rechazadas_db
+        # Solo después del commit, como en Form.guardar_peticion_db
+        for correo, id_usuario in usuarios.items():
+            USUARIOS.agregar(correo, id_usuario)
+
+        if rechazadas:
+            nuevo = not os.path.exists(ruta_rechazadas)
+            with open(ruta_rechazadas, "a", newline="", encoding="utf-8") as f:
+                escritor = csv.writer(f)
+                if nuevo:
+                    escritor.writerow(["fila", "correo", "motivo"])
+                escritor.writerows(sorted(rechazadas))
+
+        punto["filas"] = primera + len(df)
+        punto["insertadas"] += insertadas
+        punto["existentes"] += existentes
+        punto["rechazadas"] += len(rechazadas)
+        _guardar_punto(ruta_punto, punto)
+        filas_sesion += len(df)
+        logger.info("Filas %d-%d: %d insertadas, %d ya existían, %d rechazadas (%.0f filas/s)",
+                    primera + 1, punto["filas"], insertadas, existentes, len(rechazadas),
+                    filas_sesion / (time.perf_counter() - inicio))
+
+    if punto["insertadas"]:
+        # Alguna fila pudo entrar sin finalizar: la tabla de espera y el contador se actualizan
+        cola.invalidar()
+    return punto
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", help="CSV o Excel (.xlsx) con las peticiones")
+    parser.add_argument("--hoja", help="hoja del Excel (por defecto la activa)")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="filas por lote y transacción")
+    parser.add_argument("--estado", default=ESTADO_POR_DEFECTO, help="estado de las filas que no traen uno")
+    parser.add_argument("--formato-fecha",
+                        help="formato de las fechas para strptime (por defecto cada celda por separado)")
+    parser.add_argument("--reiniciar", action="store_true", help="ignora el punto de control")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    resumen = importar(args.archivo, args.lote, args.hoja, args.estado, args.formato_fecha, args.reiniciar)
+    print(json.dumps(resumen, indent=2))
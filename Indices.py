@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+def normalizar_filtros(generos=None, dispositivos=None, fecha_inicio=None, fecha_fin=None) -> dict:
+    """Filtros adicionales a REGION en el formato de `IndiceBitmap.mascara`; solo los que están activos."""
+    filtros = {}
+    if generos:
+        filtros["GENRE"] = sorted(generos)
+    if dispositivos:
+        filtros["DEVICE"] = sorted(dispositivos)
+    if fecha_inicio or fecha_fin:
+        filtros["DATE"] = (fecha_inicio or None, fecha_fin or None)
+    return filtros
+
+
+class IndiceBitmap:
+    """
+    Índice de bitmaps empaquetados sobre las filas de un DataFrame.
+
+    Para cada valor de las columnas categóricas se guarda un bitmap (1 bit por fila) y para
+    la columna de fecha un orden de las filas por fecha, de modo que un rango se resuelve con
+    dos búsquedas binarias. Un filtro combinado es un OR de los bitmaps de cada columna y un
+    AND entre columnas, sobre n/8 bytes en lugar de recorrer la tabla por cada filtro.
+    """
+
+    def __init__(self, df: pd.DataFrame, columnas=("REGION", "GENRE", "DEVICE"), columna_fecha: str = "DATE"):
+        self.filas = len(df)
+        self.bitmaps = {}
+        for columna in columnas:
+            categorias = pd.Categorical(df[columna])
+            codigos = categorias.codes
+            self.bitmaps[columna] = {
+                valor: np.packbits(codigos == i) for i, valor in enumerate(categorias.categories)
+            }
+
+        self.columna_fecha = columna_fecha
+        if columna_fecha:
+            fechas = df[columna_fecha].to_numpy()
+            self.orden_fechas = np.argsort(fechas, kind="stable")
+            self.fechas_ordenadas = fechas[self.orden_fechas]
+
+    def _vacio(self):
+        return np.zeros((self.filas + 7) // 8, dtype=np.uint8)
+
+    def _valores(self, columna, valores):
+        bitmaps = self.bitmaps[columna]
+        resultado = self._vacio()
+        for valor in valores:
+            if valor in bitmaps:
+                resultado |= bitmaps[valor]
+        return resultado
+
+    def _rango_fechas(self, inicio, fin):
+        # El fin es inclusivo: se toma hasta el inicio del día siguiente
+        desde = 0 if inicio is None else np.searchsorted(
+            self.fechas_ordenadas, np.datetime64(pd.Timestamp(inicio).normalize()), side="left")
+        hasta = self.filas if fin is None else np.searchsorted(
+            self.fechas_ordenadas, np.datetime64(pd.Timestamp(fin).normalize() + pd.Timedelta(days=1)), side="left")
+        seleccion = np.zeros(self.filas, dtype=bool)
+        seleccion[self.orden_fechas[desde:hasta]] = True
+        return np.packbits(seleccion)
+
+    def bitmap(self, **filtros) -> np.ndarray:
+        """
+        Bitmap empaquetado de las filas que cumplen todos los filtros.
+
+        Cada filtro es una lista de valores (columna categórica) o una tupla (inicio, fin) para
+        la columna de fecha. Los filtros vacíos o None no restringen.
+        """
+        resultado = None
+        for columna, valores in filtros.items():
+            if not valores:
+                continue
+            if columna == self.columna_fecha:
+                parcial = self._rango_fechas(*valores)
+            else:
+                parcial = self._valores(columna, valores)
+            resultado = parcial if resultado is None else resultado & parcial
+        if resultado is None:
+            return np.packbits(np.ones(self.filas, dtype=bool))
+        return resultado
+
+    def mascara(self, **filtros) -> np.ndarray:
+        """Igual que `bitmap`, pero como arreglo booleano para indexar el DataFrame."""
+        return np.unpackbits(self.bitmap(**filtros), count=self.filas).astype(bool)
@@ -0,0 +1,366 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin candado entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# NOTION_API_URL permite apuntar a un servidor local de pruebas
+URL_BASE = os.getenv("NOTION_API_URL", "https://api.notion.com/v1").rstrip("/")
+NOTION_TOKEN = os.getenv("NOTION_TOKEN")
+DATABASE_ID = os.getenv("DATABASE_ID")
+VERSION_API = "2022-06-28"
+
+# Propiedad de texto con el folio de la petición, para emparejar la página con su fila de MySQL.
+# Sin configurar no se envía: una base de Notion sin esa propiedad rechazaría todas las páginas
+PROPIEDAD_FOLIO = os.getenv("NOTION_PROPIEDAD_FOLIO") or None
+
+RUTA_OUTBOX = os.getenv("NOTION_OUTBOX", "DATA/notion_outbox.sqlite3")
+# Notion admite en promedio 3 peticiones por segundo por integración
+PETICIONES_POR_SEGUNDO = float(os.getenv("NOTION_RPS", "3"))
+MAX_INTENTOS = int(os.getenv("NOTION_MAX_INTENTOS", "8"))
+TIMEOUT = float(os.getenv("NOTION_TIMEOUT", "10"))
+# Segundos que una página queda reservada por el worker que la está enviando
+RESERVA = TIMEOUT * 3
+# Segundos que se espera a que otro proceso suelte la base de la cola antes de fallar
+TIMEOUT_OUTBOX = float(os.getenv("NOTION_OUTBOX_TIMEOUT", "5"))
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    propiedades TEXT NOT NULL,
+    estado TEXT NOT NULL DEFAULT 'pendiente',  -- pendiente | enviando | enviado | muerto
+    intentos INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL,
+    ultimo_error TEXT,
+    page_id TEXT,
+    creado REAL NOT NULL,
+    enviado REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_pendientes ON outbox (estado, proximo_intento);
+"""
+
+
+class ErrorNotion(Exception):
+    def __init__(self, mensaje, reintentable, espera=None):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+        self.espera = espera
+
+
+class LimiteTasa:
+    """Token bucket: `tasa` fichas por segundo con ráfagas de hasta `capacidad`."""
+
+    def __init__(self, tasa: float, capacidad: float = None):
+        self.tasa = tasa
+        self.capacidad = capacidad or max(tasa, 1)
+        self._fichas = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                faltante = (1 - self._fichas) / self.tasa
+            time.sleep(faltante)
+
+
+def crear_sesion(token: str = NOTION_TOKEN, url_base: str = URL_BASE) -> requests.Session:
+    """Sesión keep-alive con las cabeceras de la API de Notion (una conexión reutilizada)."""
+    sesion = requests.Session()
+    sesion.headers.update({
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+        "Notion-Version": VERSION_API,
+    })
+    sesion.mount(url_base.rstrip("/"), HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    return sesion
+
+
+def error_respuesta(res) -> ErrorNotion:
+    """ErrorNotion para una respuesta fallida: 429 y 5xx se reintentan (429 con su Retry-After)."""
+    espera = None
+    if res.status_code == 429:
+        try:
+            espera = float(res.headers.get("Retry-After", ""))
+        except ValueError:
+            pass
+    reintentable = res.status_code == 429 or res.status_code >= 500
+    return ErrorNotion(f"HTTP {res.status_code}: {res.text[:500]}", reintentable, espera)
+
+
+def espera_reintento(intentos: int, base: float = 1.0, maximo: float = 300.0) -> float:
+    """Backoff exponencial con jitter completo: entre 0 y base·2^intentos, acotado por `maximo`."""
+    return random.uniform(0, min(maximo, base * 2 ** intentos))
+
+
+class OutboxNotion:
+    """
+    Cola durable (SQLite) de páginas por crear en Notion, vaciada por un hilo en segundo plano.
+
+    `encolar` solo escribe una fila local, así que el callback no espera a Notion. El hilo
+    envía las páginas, las más antiguas primero, con una sesión keep-alive y respetando el
+    límite de tasa. Los errores de red, 429 y 5xx se reintentan con backoff exponencial (o lo
+    que indique Retry-After); los demás errores, o agotar `max_intentos`, dejan la fila como
+    'muerto' con el último error para revisarla y reencolarla (`reencolar_muertos`).
+
+    Con varios workers de gunicorn solo uno vacía la cola a la vez (candado de archivo junto a
+    la base), así el límite de tasa es global. Si un worker muere a medio envío, la fila se
+    libera cuando vence su reserva.
+    """
+
+    def __init__(self, ruta: str = RUTA_OUTBOX, url_base: str = URL_BASE, token: str = NOTION_TOKEN,
+                 database_id: str = DATABASE_ID, peticiones_por_segundo: float = PETICIONES_POR_SEGUNDO,
+                 max_intentos: int = MAX_INTENTOS, timeout: float = TIMEOUT):
+        self.ruta = ruta
+        self.url_base = url_base.rstrip("/")
+        self.token = token
+        self.database_id = database_id
+        self.max_intentos = max_intentos
+        self.timeout = timeout
+        self.limite = LimiteTasa(peticiones_por_segundo)
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pid = None
+        self._sesion = None
+        self._candado = None
+        self._lock = threading.Lock()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        with self._conectar() as conn:
+            conn.executescript(ESQUEMA)
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=TIMEOUT_OUTBOX, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return _Cerrar(conn)
+
+    # --- productor -----------------------------------------------------------------------
+
+    def encolar(self, propiedades: dict, confirmar=nullcontext) -> int:
+        """
+        Guarda la página en la cola y despierta al hilo que la envía. Devuelve el id de la fila.
+
+        La fila se confirma dentro de `confirmar()`; si este lanza una excepción, la fila se
+        descarta (ver Form.PlazoDestino).
+        """
+        ahora = time.time()
+        with self._conectar() as conn:
+            conn.execute("BEGIN")
+            cursor = conn.execute(
+                "INSERT INTO outbox (propiedades, proximo_intento, creado) VALUES (?, ?, ?)",
+                (json.dumps(propiedades, ensure_ascii=False), ahora, ahora),
+            )
+            # Sin COMMIT la fila desaparece al cerrar la conexión
+            with confirmar():
+                conn.execute("COMMIT")
+        self.iniciar()
+        self._despertar.set()
+        return cursor.lastrowid
+
+    # --- consumidor ----------------------------------------------------------------------
+
+    def _obtener_sesion(self):
+        if self._sesion is None:
+            self._sesion = crear_sesion(self.token, self.url_base)
+        return self._sesion
+
+    def crear_pagina(self, propiedades: dict) -> dict:
+        """Crea la página en Notion; lanza `ErrorNotion` indicando si vale la pena reintentar."""
+        payload = {"parent": {"database_id": self.database_id}, "properties": propiedades}
+        self.limite.esperar()
+        try:
+            res = self._obtener_sesion().post(f"{self.url_base}/pages", json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ErrorNotion(f"{type(e).__name__}: {e}", reintentable=True)
+
+        if res.status_code in (200, 201):
+            return res.json()
+        raise error_respuesta(res)
+
+    def _reservar(self):
+        ahora = time.time()
+        with self._conectar() as conn:
+            return conn.execute(
+                """
+                UPDATE outbox SET estado = 'enviando', proximo_intento = ?
+                WHERE id = (
+                    SELECT id FROM outbox
+                    WHERE estado IN ('pendiente', 'enviando') AND proximo_intento <= ?
+                    ORDER BY id LIMIT 1
+                )
+                RETURNING id, propiedades, intentos
+                """,
+                (ahora + RESERVA, ahora),
+            ).fetchone()
+
+    def _procesar(self, id_, propiedades, intentos):
+        try:
+            page_id = self.crear_pagina(json.loads(propiedades))["id"]
+        except Exception as e:
+            # Cualquier otro error (una respuesta que no es JSON o sin id, una fila corrupta)
+            # cuenta como un intento fallido más: si no, la fila se reintentaría para siempre
+            if isinstance(e, ErrorNotion):
+                error = e
+            else:
+                logger.exception("Error inesperado al enviar la página %s de Notion", id_)
+                error = ErrorNotion(f"{type(e).__name__}: {e}", reintentable=True)
+            intentos += 1
+            if not error.reintentable or intentos >= self.max_intentos:
+                logger.error("Página %s de Notion descartada tras %d intentos: %s", id_, intentos, error)
+                estado, proximo = "muerto", time.time()
+            else:
+                espera = error.espera if error.espera is not None else espera_reintento(intentos)
+                logger.warning("Reintento %d de la página %s en %.1f s: %s", intentos, id_, espera, error)
+                estado, proximo = "pendiente", time.time() + espera
+            with self._conectar() as conn:
+                conn.execute(
+                    "UPDATE outbox SET estado = ?, intentos = ?, proximo_intento = ?, ultimo_error = ? WHERE id = ?",
+                    (estado, intentos, proximo, str(error), id_),
+                )
+            return False
+
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE outbox SET estado = 'enviado', intentos = ?, page_id = ?, enviado = ?, ultimo_error = NULL "
+                "WHERE id = ?",
+                (intentos + 1, page_id, time.time(), id_),
+            )
+        return True
+
+    def procesar_pendientes(self, limite: int = None) -> int:
+        """Envía las páginas pendientes que ya tocan; devuelve cuántas se enviaron con éxito."""
+        enviadas = procesadas = 0
+        while limite is None or procesadas < limite:
+            fila = self._reservar()
+            if fila is None:
+                break
+            procesadas += 1
+            enviadas += self._procesar(*fila)
+        return enviadas
+
+    def _tomar_candado(self):
+        if fcntl is None:
+            return True
+        if self._candado is None:
+            self._candado = open(f"{self.ruta}.lock", "a")
+        try:
+            fcntl.flock(self._candado, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            try:
+                if self._tomar_candado():
+                    self.procesar_pendientes()
+            except Exception:
+                logger.exception("Error en el envío de páginas a Notion")
+            # Se revisa la cola cada segundo por los reintentos y lo que encolen otros workers
+            self._despertar.wait(1.0)
+            self._despertar.clear()
+
+    def iniciar(self):
+        """Arranca el hilo de envío en este proceso (se vuelve a arrancar tras un fork)."""
+        pid = os.getpid()
+        if self._pid == pid and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._hilo.is_alive():
+                return
+            # Tras un fork el candado y la sesión del proceso padre no sirven
+            self._candado = None
+            self._sesion = None
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="outbox-notion", daemon=True)
+            self._hilo.start()
+            self._pid = pid
+
+    def detener(self, espera: float = 5.0):
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+
+    # --- mantenimiento -------------------------------------------------------------------
+
+    def estado(self) -> dict:
+        """Número de filas por estado."""
+        with self._conectar() as conn:
+            return dict(conn.execute("SELECT estado, COUNT(*) FROM outbox GROUP BY estado").fetchall())
+
+    def reencolar_muertos(self) -> int:
+        """Vuelve a poner en cola las páginas descartadas (p. ej. después de corregir el token)."""
+        with self._conectar() as conn:
+            cursor = conn.execute(
+                "UPDATE outbox SET estado = 'pendiente', intentos = 0, proximo_intento = ? WHERE estado = 'muerto'",
+                (time.time(),),
+            )
+        self._despertar.set()
+        return cursor.rowcount
+
+
+class _Cerrar:
+    """sqlite3.Connection como context manager que cierra la conexión (el de sqlite3 no la cierra)."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def obtener_outbox() -> OutboxNotion:
+    """Outbox compartida del proceso, creada en el primer uso."""
+    global _outbox
+    if _outbox is None:
+        with _outbox_lock:
+            if _outbox is None:
+                _outbox = OutboxNotion()
+    return _outbox
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Estado y mantenimiento de la cola de páginas de Notion")
+    parser.add_argument("--reencolar-muertos", action="store_true")
+    parser.add_argument("--enviar", action="store_true", help="envía ahora las páginas pendientes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    outbox = OutboxNotion()
+    if args.reencolar_muertos:
+        print("Reencoladas:", outbox.reencolar_muertos())
+    if args.enviar:
+        print("Enviadas:", outbox.procesar_pendientes())
+    print(outbox.estado())
@@ -0,0 +1,218 @@
+import logging
+import os
+import time
+from datetime import datetime
+
+import requests
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Después de load_dotenv para que estos módulos lean su configuración del .env
+from Cola import cola
+from Conexion import obtener_conexion
+from Notion import (DATABASE_ID, MAX_INTENTOS, NOTION_TOKEN, PETICIONES_POR_SEGUNDO, PROPIEDAD_FOLIO,
+                    TIMEOUT, URL_BASE, ErrorNotion, LimiteTasa, crear_sesion, error_respuesta,
+                    espera_reintento)
+
+logger = logging.getLogger(__name__)
+
+# Fila de la tabla Sincronizacion con el cursor de esta sincronización
+ORIGEN = "notion_estados"
+PROPIEDAD_ESTADO = "Estado"
+PROPIEDAD_CORREO = "Correo"
+PROPIEDAD_FECHA = "Fecha Peticion"
+# Estados de Notion que cuentan como terminados; en MySQL quedan como 'Finalizada', que es lo
+# que excluyen la tabla de espera y el contador
+ESTADOS_FINALIZADOS = {
+    estado.strip() for estado in os.getenv("NOTION_ESTADOS_FINALIZADOS", "Listo,Finalizada").split(",")
+    if estado.strip()
+}
+FINALIZADA = "Finalizada"
+# Máximo de páginas por respuesta que admite la API
+TAMANO_LOTE = 100
+
+ACTUALIZAR_POR_FOLIO = """
+    UPDATE Peticion SET estado_petición = %s
+    WHERE folio = %s AND NOT (estado_petición <=> %s)
+"""
+# Páginas sin folio: se emparejan por correo y fecha de la petición. Con NOTION_PROPIEDAD_FOLIO
+# configurada solo las peticiones anteriores al folio; sin ella, todas
+ACTUALIZAR_POR_CORREO_Y_FECHA = """
+    UPDATE Peticion p
+    JOIN Usuarios u ON u.id_usuarios = p.id_usuarios
+    JOIN Usuarios_unicos uu ON uu.id_usuarios_unicos = u.id_usuarios_unicos
+    SET p.estado_petición = %s
+    WHERE uu.nombre_usuarios_unicos = %s AND p.fecha_petición = %s
+      AND NOT (p.estado_petición <=> %s)
+"""
+ACTUALIZAR_SIN_FOLIO_POR_CORREO_Y_FECHA = ACTUALIZAR_POR_CORREO_Y_FECHA + "      AND p.folio IS NULL\n"
+
+
+def _valor(pagina, nombre):
+    """Texto de una propiedad title/rich_text, nombre de una status/select o inicio de una date."""
+    propiedad = pagina.get("properties", {}).get(nombre) or {}
+    valor = propiedad.get(propiedad.get("type"))
+    if isinstance(valor, list):
+        return "".join(parte.get("plain_text", "") for parte in valor) or None
+    if isinstance(valor, dict):
+        return valor.get("name") or valor.get("start")
+    return valor
+
+
+def _fecha(texto):
+    # Notion devuelve ISO 8601; se compara con el DATETIME de MySQL, que no guarda zona horaria
+    try:
+        return datetime.fromisoformat(texto).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def estado_mysql(estado_notion: str) -> str:
+    return FINALIZADA if estado_notion in ESTADOS_FINALIZADOS else estado_notion
+
+
+class SincronizacionEstados:
+    """
+    Copia a `Peticion.estado_petición` el "Estado" que el equipo cambia en Notion.
+
+    Cada pasada pide a Notion solo las páginas editadas desde el último cambio aplicado
+    (filtro por `last_edited_time`, en orden ascendente y paginando con `start_cursor`) y
+    actualiza las filas cuyo estado cambió con un `executemany`, en la misma transacción que
+    guarda el nuevo cursor en la tabla `Sincronizacion`. Así puede correr cada minuto sin leer
+    toda la base de Notion.
+
+    Notion redondea `last_edited_time` al minuto, por eso el filtro es `on_or_after`: las
+    páginas del último minuto se vuelven a leer en la pasada siguiente, pero como solo se
+    actualizan las filas cuyo estado difiere, repetirlas no escribe nada.
+    """
+
+    def __init__(self, url_base: str = URL_BASE, token: str = NOTION_TOKEN, database_id: str = DATABASE_ID,
+                 peticiones_por_segundo: float = PETICIONES_POR_SEGUNDO, max_intentos: int = MAX_INTENTOS,
+                 timeout: float = TIMEOUT):
+        self.url_base = url_base.rstrip("/")
+        self.database_id = database_id
+        self.max_intentos = max_intentos
+        self.timeout = timeout
+        self.limite = LimiteTasa(peticiones_por_segundo)
+        self.sesion = crear_sesion(token, self.url_base)
+
+    def _consultar(self, cuerpo):
+        intentos = 0
+        while True:
+            self.limite.esperar()
+            try:
+                res = self.sesion.post(f"{self.url_base}/databases/{self.database_id}/query",
+                                       json=cuerpo, timeout=self.timeout)
+                if res.status_code == 200:
+                    return res.json()
+                error = error_respuesta(res)
+            except requests.RequestException as e:
+                error = ErrorNotion(f"{type(e).__name__}: {e}", reintentable=True)
+            intentos += 1
+            if not error.reintentable or intentos >= self.max_intentos:
+                raise error
+            espera = error.espera if error.espera is not None else espera_reintento(intentos)
+            logger.warning("Reintento %d de la consulta a Notion en %.1f s: %s", intentos, espera, error)
+            time.sleep(espera)
+
+    def paginas_editadas(self, desde: str = None):
+        """Páginas de la base editadas desde `desde` (o todas), de la más antigua a la más reciente."""
+        cuerpo = {"page_size": TAMANO_LOTE,
+                  "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+        if desde:
+            cuerpo["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": desde}}
+        while True:
+            respuesta = self._consultar(cuerpo)
+            yield from respuesta.get("results", [])
+            if not respuesta.get("has_more") or not respuesta.get("next_cursor"):
+                return
+            cuerpo["start_cursor"] = respuesta["next_cursor"]
+
+    def _leer_cursor(self):
+        with obtener_conexion() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT ultimo_cambio FROM Sincronizacion WHERE origen = %s", (ORIGEN,))
+            fila = cursor.fetchone()
+            cursor.close()
+        return fila[0] if fila else None
+
+    def sincronizar(self, desde_cero: bool = False) -> dict:
+        """Aplica los cambios de estado hechos en Notion desde la pasada anterior; devuelve un resumen."""
+        desde = None if desde_cero else self._leer_cursor()
+
+        # Se lee todo Notion antes de pedir una conexión, para no tenerla ocupada entre páginas.
+        # Si una página aparece dos veces, gana su versión más reciente (la última)
+        por_folio, por_correo_y_fecha = {}, {}
+        ultimo_cambio = desde
+        leidas = 0
+        for pagina in self.paginas_editadas(desde):
+            leidas += 1
+            ultimo_cambio = max(ultimo_cambio or "", pagina["last_edited_time"])
+            estado = _valor(pagina, PROPIEDAD_ESTADO)
+            if estado is None or pagina.get("archived") or pagina.get("in_trash"):
+                continue
+            estado = estado_mysql(estado)
+            folio = _valor(pagina, PROPIEDAD_FOLIO) if PROPIEDAD_FOLIO else None
+            if folio:
+                por_folio[folio] = estado
+                continue
+            correo, fecha = _valor(pagina, PROPIEDAD_CORREO), _fecha(_valor(pagina, PROPIEDAD_FECHA))
+            if correo and fecha:
+                por_correo_y_fecha[correo, fecha] = estado
+
+        actualizadas = 0
+        if por_folio or por_correo_y_fecha or ultimo_cambio != desde:
+            with obtener_conexion() as conn:
+                cursor = conn.cursor()
+                if por_folio:
+                    cursor.executemany(ACTUALIZAR_POR_FOLIO,
+                                       [(estado, folio, estado) for folio, estado in por_folio.items()])
+                    actualizadas += cursor.rowcount
+                if por_correo_y_fecha:
+                    consulta = (ACTUALIZAR_SIN_FOLIO_POR_CORREO_Y_FECHA if PROPIEDAD_FOLIO
+                                else ACTUALIZAR_POR_CORREO_Y_FECHA)
+                    cursor.executemany(consulta,
+                                       [(estado, correo, fecha, estado)
+                                        for (correo, fecha), estado in por_correo_y_fecha.items()])
+                    actualizadas += cursor.rowcount
+                cursor.execute(
+                    """
+                    INSERT INTO Sincronizacion (origen, ultimo_cambio, actualizado) VALUES (%s, %s, NOW())
+                    ON DUPLICATE KEY UPDATE ultimo_cambio = VALUES(ultimo_cambio),
+                                            actualizado = VALUES(actualizado)
+                    """,
+                    (ORIGEN, ultimo_cambio),
+                )
+                conn.commit()
+                cursor.close()
+
+        if actualizadas:
+            # La tabla de espera y el contador de todos los workers vuelven a consultar; el índice
+            # de posiciones solo lee las filas cambiadas y quita las que se finalizaron
+            cola.invalidar()
+        return {"paginas_leidas": leidas, "filas_actualizadas": actualizadas, "ultimo_cambio": ultimo_cambio}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Copia a MySQL los estados editados en Notion")
+    parser.add_argument("--cada", type=float, help="repite la sincronización cada tantos segundos")
+    parser.add_argument("--desde-cero", action="store_true", help="ignora el cursor y relee toda la base")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sincronizacion = SincronizacionEstados()
+    desde_cero = args.desde_cero
+    while True:
+        try:
+            logger.info("Sincronización: %s", sincronizacion.sincronizar(desde_cero))
+            desde_cero = False
+        except Exception:
+            if not args.cada:
+                raise
+            logger.exception("Error al sincronizar los estados desde Notion")
+        if not args.cada:
+            break
+        time.sleep(args.cada)
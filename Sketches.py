@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+# Con 2^14 registros el error típico de HyperLogLog ronda el 0.8%
+PRECISION = 14
+
+
+def _hashes(serie: pd.Series) -> np.ndarray:
+    """Hash de 64 bits estable para cada valor de la serie."""
+    return pd.util.hash_pandas_object(serie, index=False).to_numpy()
+
+
+def _longitud_bits(x: np.ndarray) -> np.ndarray:
+    # Búsqueda binaria por desplazamientos; evita los errores de redondeo de log2 con uint64
+    n = np.zeros(x.shape, dtype=np.uint8)
+    for s in (32, 16, 8, 4, 2, 1):
+        mayor = x >= (np.uint64(1) << np.uint64(s))
+        n[mayor] += s
+        x = np.where(mayor, x >> np.uint64(s), x)
+    return n + (x > 0)
+
+
+def _indices_y_rangos(hashes: np.ndarray, precision: int):
+    """Registro destino y rango (posición del primer bit a 1) de cada hash."""
+    p = np.uint64(precision)
+    indices = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+    # El bit centinela acota el rango a 64 - p + 1 cuando el resto del hash es cero
+    resto = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+    rangos = (np.uint8(65) - _longitud_bits(resto)).astype(np.uint8)
+    return indices, rangos
+
+
+def kpis_exactos(filas: pd.DataFrame):
+    """(clientes distintos, % multi-dispositivo) exactos a partir de filas con CUSTOMER_ID y DEVICE."""
+    device_count = filas.groupby("CUSTOMER_ID", observed=True)["DEVICE"].nunique()
+    if device_count.empty:
+        return 0, 0.0
+    return len(device_count), (device_count > 1).mean() * 100
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog para contar valores distintos; dos sketches se combinan con `unir`."""
+
+    def __init__(self, precision: int = PRECISION, registros: np.ndarray = None):
+        self.precision = precision
+        self.registros = registros if registros is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def desde_serie(cls, serie: pd.Series, precision: int = PRECISION) -> "HyperLogLog":
+        sketch = cls(precision)
+        indices, rangos = _indices_y_rangos(_hashes(serie), precision)
+        np.maximum.at(sketch.registros, indices, rangos)
+        return sketch
+
+    def reducir(self, precision: int) -> "HyperLogLog":
+        """
+        Mismo sketch con menos registros (menos bytes, más error).
+
+        Los bits del índice que se pierden pasan a formar parte del rango: si no son todos cero,
+        el primer bit a 1 está entre ellos; si lo son, el rango anterior se desplaza.
+        """
+        sobrantes = self.precision - precision
+        if sobrantes <= 0:
+            return self
+        bloques = self.registros.reshape(1 << precision, 1 << sobrantes).astype(np.int16)
+        k = np.arange(1 << sobrantes, dtype=np.uint64)
+        rango_k = (sobrantes + 1 - _longitud_bits(k).astype(np.int16))
+        contribucion = np.where(k == 0, bloques + sobrantes, rango_k)
+        registros = np.where(bloques > 0, contribucion, 0).max(axis=1).astype(np.uint8)
+        return HyperLogLog(precision, registros)
+
+    def unir(self, otro: "HyperLogLog") -> "HyperLogLog":
+        return HyperLogLog(self.precision, np.maximum(self.registros, otro.registros))
+
+    def estimar(self) -> float:
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.sum(np.exp2(-self.registros.astype(np.float64)))
+        vacios = np.count_nonzero(self.registros == 0)
+        # Corrección para cardinalidades pequeñas (conteo lineal)
+        if estimacion <= 2.5 * m and vacios:
+            return m * np.log(m / vacios)
+        return float(estimacion)
+
+
+class SketchesClientes:
+    """
+    Sketches por REGION para los KPIs de clientes.
+
+    Por cada región se guarda un sketch de clientes y otro de clientes vistos en más de un
+    dispositivo dentro de esa región. Cualquier combinación de regiones se responde uniendo
+    sketches, sin recorrer las filas. Con `exacto=True` se calcula el valor exacto a partir de
+    los pares únicos (REGION, CUSTOMER_ID, DEVICE), pensado para auditorías.
+
+    Un cliente que aparece en varias regiones puede usar un dispositivo distinto en cada una,
+    y eso no se puede deducir uniendo sketches. Esos clientes (pocos frente al total) se guardan
+    aparte con sus pares exactos y se suman al resultado del sketch.
+    """
+
+    def __init__(self, df: pd.DataFrame, precision: int = PRECISION):
+        self.precision = precision
+        self.pares = df[["REGION", "CUSTOMER_ID", "DEVICE"]].drop_duplicates()
+
+        self.clientes = self._sketch_por_region(self.pares[["REGION", "CUSTOMER_ID"]].drop_duplicates())
+
+        regiones_por_cliente = self.pares.groupby("CUSTOMER_ID", observed=True)["REGION"].nunique()
+        en_varias = self.pares["CUSTOMER_ID"].isin(regiones_por_cliente.index[regiones_por_cliente > 1])
+        self.itinerantes = self.pares[en_varias]
+        # Los mismos pares como códigos enteros, para contarlos con numpy en cada consulta
+        self._codigo_region = {r: i for i, r in enumerate(self.pares["REGION"].unique())}
+        self._region_itinerante = self.itinerantes["REGION"].map(self._codigo_region).to_numpy()
+        self._n_dispositivos = max(1, self.pares["DEVICE"].nunique())
+        clientes = pd.factorize(self.itinerantes["CUSTOMER_ID"])[0].astype(np.int64)
+        dispositivos = pd.factorize(self.itinerantes["DEVICE"])[0]
+        self._par_itinerante = clientes * self._n_dispositivos + dispositivos
+
+        dispositivos = self.pares[~en_varias].groupby(["REGION", "CUSTOMER_ID"], observed=True).size()
+        multi = dispositivos[dispositivos > 1].reset_index()[["REGION", "CUSTOMER_ID"]]
+        self.multi_dispositivo = self._sketch_por_region(multi)
+
+    def _sketch_por_region(self, clientes_region):
+        indices, rangos = _indices_y_rangos(_hashes(clientes_region["CUSTOMER_ID"]), self.precision)
+        sketches = {}
+        for region, posiciones in clientes_region.groupby("REGION", observed=True).indices.items():
+            sketch = HyperLogLog(self.precision)
+            np.maximum.at(sketch.registros, indices[posiciones], rangos[posiciones])
+            sketches[region] = sketch
+        return sketches
+
+    def _unir(self, sketches, regiones):
+        unido = HyperLogLog(self.precision)
+        for region in regiones or sketches.keys():
+            if region in sketches:
+                unido = unido.unir(sketches[region])
+        return unido
+
+    @staticmethod
+    def _en_regiones(pares, regiones):
+        return pares[pares["REGION"].isin(regiones)] if regiones else pares
+
+    def _itinerantes_multi(self, regiones) -> int:
+        """Clientes de varias regiones que usan más de un dispositivo en las regiones dadas."""
+        seleccion = slice(None)
+        if regiones:
+            codigos = [self._codigo_region[r] for r in regiones if r in self._codigo_region]
+            seleccion = np.isin(self._region_itinerante, codigos)
+        pares = np.unique(self._par_itinerante[seleccion])
+        return int(np.count_nonzero(np.bincount(pares // self._n_dispositivos) > 1))
+
+    def kpis(self, regiones=None, exacto: bool = False):
+        """Devuelve (clientes distintos, % de clientes multi-dispositivo) para las regiones dadas."""
+        if exacto:
+            return kpis_exactos(self._en_regiones(self.pares, regiones))
+
+        num_clientes = self._unir(self.clientes, regiones).estimar()
+        if num_clientes == 0:
+            return 0, 0.0
+        multi = self._unir(self.multi_dispositivo, regiones).estimar() + self._itinerantes_multi(regiones)
+        return round(num_clientes), min(multi / num_clientes, 1.0) * 100
@@ -0,0 +1,192 @@
+// Filtrado en el navegador para Dashboard.py (DASHBOARD_CLIENTE=1).
+// Recalcula KPIs y figuras a partir del dcc.Store generado por Cliente.construir_datos_cliente.
+(function () {
+    function decodificar(b64) {
+        var binario = atob(b64);
+        var bytes = new Uint8Array(binario.length);
+        for (var i = 0; i < binario.length; i++) {
+            bytes[i] = binario.charCodeAt(i);
+        }
+        return bytes;
+    }
+
+    // Une sketches dispersos (índices uint16 little-endian + rangos uint8) en registros densos
+    function unirSketch(registros, disperso) {
+        if (!disperso) {
+            return;
+        }
+        var indices = decodificar(disperso.i);
+        var rangos = decodificar(disperso.r);
+        for (var j = 0; j < rangos.length; j++) {
+            var indice = indices[2 * j] | (indices[2 * j + 1] << 8);
+            if (rangos[j] > registros[indice]) {
+                registros[indice] = rangos[j];
+            }
+        }
+    }
+
+    // Misma estimación que Sketches.HyperLogLog.estimar
+    function estimar(registros) {
+        var m = registros.length;
+        var alfa = 0.7213 / (1 + 1.079 / m);
+        var suma = 0;
+        var vacios = 0;
+        for (var i = 0; i < m; i++) {
+            suma += Math.pow(2, -registros[i]);
+            if (registros[i] === 0) {
+                vacios++;
+            }
+        }
+        var estimacion = alfa * m * m / suma;
+        if (estimacion <= 2.5 * m && vacios > 0) {
+            return m * Math.log(m / vacios);
+        }
+        return estimacion;
+    }
+
+    function sumarPares(destino, pares) {
+        for (var i = 0; i < pares.length; i++) {
+            destino[pares[i][0]] = (destino[pares[i][0]] || 0) + pares[i][1];
+        }
+    }
+
+    // Mismos intervalos enteros que Figuras.histograma_de_conteos
+    function agruparHistograma(conteos, nbins) {
+        var valores = Object.keys(conteos).map(Number);
+        if (!valores.length) {
+            return {x: [], y: [], ancho: 1};
+        }
+        var minimo = Math.min.apply(null, valores);
+        var maximo = Math.max.apply(null, valores);
+        var ancho = Math.max(1, Math.ceil((maximo - minimo + 1) / nbins));
+        var barras = Math.ceil((maximo - minimo + 1) / ancho);
+        var x = [];
+        var y = [];
+        for (var b = 0; b < barras; b++) {
+            x.push(minimo + b * ancho + (ancho - 1) / 2);
+            y.push(0);
+        }
+        valores.forEach(function (v) {
+            y[Math.floor((v - minimo) / ancho)] += conteos[v];
+        });
+        return {x: x, y: y, ancho: ancho};
+    }
+
+    function layout(datos, titulo, x, y) {
+        var resultado = {template: {layout: datos.plantilla}, title: {text: titulo}};
+        if (x) {
+            resultado.xaxis = {title: {text: x}};
+            resultado.yaxis = {title: {text: y}};
+        }
+        return resultado;
+    }
+
+    function barras(datos, titulo, x, y, ejeX, ejeY) {
+        return {data: [{type: "bar", x: x, y: y}], layout: layout(datos, titulo, ejeX, ejeY)};
+    }
+
+    function kpi(titulo, valor) {
+        return {
+            type: "Div", namespace: "dash_html_components",
+            props: {children: [
+                {type: "H3", namespace: "dash_html_components", props: {children: titulo}},
+                {type: "H1", namespace: "dash_html_components", props: {children: valor}}
+            ]}
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        dashboard: {
+            actualizar: function (seleccion, datos) {
+                if (!datos) {
+                    return window.dash_clientside.no_update;
+                }
+                var regiones = (seleccion && seleccion.length) ? seleccion : datos.regiones;
+                regiones = regiones.filter(function (r) { return datos.por_region[r]; });
+                var cat = datos.catalogos;
+                var genero = {}, dispositivo = {}, fecha = {}, titulo = {}, recurrencia = {};
+                var clientes = new Uint8Array(1 << datos.precision);
+                var multi = new Uint8Array(1 << datos.precision);
+                var seleccionadas = {};
+
+                regiones.forEach(function (r) {
+                    var d = datos.por_region[r];
+                    seleccionadas[r] = true;
+                    sumarPares(genero, d.GENRE);
+                    sumarPares(dispositivo, d.DEVICE);
+                    sumarPares(fecha, d.DATE);
+                    sumarPares(titulo, d.TITLE);
+                    sumarPares(recurrencia, d.recurrencia);
+                    unirSketch(clientes, d.clientes);
+                    unirSketch(multi, d.multi);
+                });
+
+                // Clientes en varias regiones: vistas y dispositivos combinados de forma exacta
+                var vistasItinerantes = {}, dispositivosItinerantes = {};
+                datos.itinerantes.forEach(function (fila) {
+                    if (seleccionadas[fila[0]]) {
+                        vistasItinerantes[fila[1]] = (vistasItinerantes[fila[1]] || 0) + fila[2];
+                        var vistos = dispositivosItinerantes[fila[1]] || (dispositivosItinerantes[fila[1]] = new Set());
+                        fila[3].forEach(function (d) { vistos.add(d); });
+                    }
+                });
+                var multiItinerantes = 0;
+                Object.keys(vistasItinerantes).forEach(function (c) {
+                    recurrencia[vistasItinerantes[c]] = (recurrencia[vistasItinerantes[c]] || 0) + 1;
+                    if (dispositivosItinerantes[c].size > 1) {
+                        multiItinerantes++;
+                    }
+                });
+
+                var numClientes = estimar(clientes);
+                var pctMulti = numClientes ? Math.min((estimar(multi) + multiItinerantes) / numClientes, 1) * 100 : 0;
+
+                var posGenero = Object.keys(genero).map(Number);
+                var topGenero = posGenero.reduce(function (a, b) { return genero[b] > genero[a] ? b : a; }, posGenero[0]);
+                var posFecha = Object.keys(fecha).map(Number).sort(function (a, b) { return a - b; });
+                var posDispositivo = Object.keys(dispositivo).map(Number);
+                var top10 = Object.keys(titulo).map(Number)
+                    .sort(function (a, b) { return titulo[b] - titulo[a]; }).slice(0, 10);
+                var hist = agruparHistograma(recurrencia, 20);
+
+                var heatX = [], heatY = [], heatZ = [];
+                regiones.forEach(function (r) {
+                    datos.por_region[r].GENRE.forEach(function (par) {
+                        heatX.push(r);
+                        heatY.push(cat.GENRE[par[0]]);
+                        heatZ.push(par[1]);
+                    });
+                });
+
+                var figRecurrencia = barras(datos, "Recurrencia de consumo por cliente", hist.x, hist.y, "count", "clientes");
+                figRecurrencia.data[0].width = hist.ancho;
+                figRecurrencia.layout.bargap = 0;
+
+                return [
+                    barras(datos, "Tiempo de pantalla por género",
+                        posGenero.map(function (g) { return cat.GENRE[g]; }),
+                        posGenero.map(function (g) { return genero[g]; }), "GENRE", "SCREENTIME"),
+                    {data: [{type: "pie",
+                             labels: posDispositivo.map(function (d) { return cat.DEVICE[d]; }),
+                             values: posDispositivo.map(function (d) { return dispositivo[d]; })}],
+                     layout: layout(datos, "Distribución de dispositivos")},
+                    {data: [{type: "scatter", mode: "lines",
+                             x: posFecha.map(function (f) { return cat.DATE[f]; }),
+                             y: posFecha.map(function (f) { return fecha[f]; })}],
+                     layout: layout(datos, "Evolución del consumo", "DATE", "SCREENTIME")},
+                    barras(datos, "Consumo por región", regiones,
+                        regiones.map(function (r) { return datos.por_region[r].SCREENTIME; }), "REGION", "SCREENTIME"),
+                    barras(datos, "Top 10 contenido más visto",
+                        top10.map(function (t) { return cat.TITLE[t]; }),
+                        top10.map(function (t) { return titulo[t]; }), "TITLE", "SCREENTIME"),
+                    figRecurrencia,
+                    {data: [{type: "histogram2d", histfunc: "sum", x: heatX, y: heatY, z: heatZ}],
+                     layout: layout(datos, "Relación entre región y género", "REGION", "GENRE")},
+                    kpi("Clientes que consumen video", String(Math.round(numClientes))),
+                    kpi("Género más visto", posGenero.length ? cat.GENRE[topGenero] : ""),
+                    kpi("Usuarios multi-dispositivo", pctMulti.toFixed(1) + "%")
+                ];
+            }
+        }
+    });
+})();
@@ -0,0 +1,15 @@
+"""
+Benchmarks de los dashboards con datos sintéticos en el esquema de DATA/Examen.xlsx.
+
+    python -m bench                     # genera 1x, 10x, 100x y 1000x y mide cada escala
+    python -m bench --escalas 1 10      # solo algunas escalas
+    python -m bench.generar --escala 10 --excel
+    python -m bench.medir --dataset bench/datos/sintetico_10x.feather
+
+Prueba de carga del envío de Form.py con MySQL local y un stub de Notion:
+
+    python -m bench.formulario --usuarios 8 --envios 200 --latencia-notion 300
+    python -m bench.notion_stub --puerto 8099 --errores 0.05   # stub suelto
+
+Todo corre sin red ni servicios externos.
+"""
@@ -0,0 +1,67 @@
+"""Genera las escalas que falten y mide cada una en un proceso aparte (para aislar el RSS)."""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from bench.generar import DIRECTORIO, guardar, generar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLUMNAS = [
+    ("escala", "{}x"),
+    ("filas", "{:,}"),
+    ("carga_s", "{:.3f}"),
+    ("arranque_dashboard_s", "{:.2f}"),
+    ("callback_sin_cache.p50_ms", "{:.1f}"),
+    ("callback_sin_cache.p95_ms", "{:.1f}"),
+    ("callback_sin_cache.p99_ms", "{:.1f}"),
+    ("callback_con_cache.p50_ms", "{:.3f}"),
+    ("bytes_respuesta_media", "{:,.0f}"),
+    ("rss_max_mb", "{:.0f}"),
+]
+
+
+def _valor(resultado, clave):
+    for parte in clave.split("."):
+        resultado = resultado.get(parte, {}) if isinstance(resultado, dict) else {}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeticiones", type=int, default=100)
+    parser.add_argument("--streamlit", action="store_true", help="también mide DB.py con Streamlit")
+    parser.add_argument("--excel", action="store_true", help="mide la conversión del Excel donde quepa")
+    parser.add_argument("--salida", help="guarda los resultados en JSON")
+    args = parser.parse_args()
+
+    resultados = []
+    for escala in args.escalas:
+        ruta = os.path.join(DIRECTORIO, f"sintetico_{escala}x.feather")
+        ruta_excel = os.path.join(DIRECTORIO, f"sintetico_{escala}x.xlsx")
+        if not os.path.exists(ruta) or (args.excel and not os.path.exists(ruta_excel)):
+            guardar(generar(escala), escala, excel=args.excel)
+
+        comando = [sys.executable, "-m", "bench.medir", "--dataset", ruta,
+                   "--repeticiones", str(args.repeticiones)]
+        if args.streamlit:
+            comando.append("--streamlit")
+        if args.excel and os.path.exists(ruta_excel):
+            comando += ["--excel", ruta_excel]
+        salida = subprocess.run(comando, cwd=RAIZ, check=True, capture_output=True, text=True).stdout
+        resultado = json.loads(salida.strip().splitlines()[-1])
+        resultado["escala"] = escala
+        resultados.append(resultado)
+        print(" | ".join(f"{clave}={formato.format(_valor(resultado, clave))}" for clave, formato in COLUMNAS),
+              flush=True)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
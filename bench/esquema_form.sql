@@ -0,0 +1,63 @@
+-- Esquema mínimo de la base de Form.py para las pruebas de carga locales (bench/formulario.py).
+-- Las claves únicas y los índices salen de migraciones/, que se aplican después de este archivo.
+
+CREATE TABLE Tipo_peticion (
+    id_tipo_peticion INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_peticion VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE Verticales (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_vertical VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE Sitios (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_sitio VARCHAR(100) NOT NULL,
+    id_vertical INT NOT NULL,
+    FOREIGN KEY (id_vertical) REFERENCES Verticales (id)
+);
+
+CREATE TABLE IP (
+    id_ip INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_ip VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE Usuarios_unicos (
+    id_usuarios_unicos INT AUTO_INCREMENT PRIMARY KEY,
+    nombre_usuarios_unicos VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE Usuarios (
+    id_usuarios INT AUTO_INCREMENT PRIMARY KEY,
+    id_usuarios_unicos INT NOT NULL,
+    nombre_usuarios VARCHAR(255),
+    FOREIGN KEY (id_usuarios_unicos) REFERENCES Usuarios_unicos (id_usuarios_unicos)
+);
+
+CREATE TABLE Peticion (
+    id_peticion INT AUTO_INCREMENT PRIMARY KEY,
+    id_tipo_peticion INT NOT NULL,
+    id_usuarios INT NOT NULL,
+    `Descripción` TEXT,
+    `fecha_petición` DATETIME NOT NULL,
+    fecha_inicio DATE,
+    fecha_final DATE,
+    `estado_petición` VARCHAR(50),
+    FOREIGN KEY (id_tipo_peticion) REFERENCES Tipo_peticion (id_tipo_peticion),
+    FOREIGN KEY (id_usuarios) REFERENCES Usuarios (id_usuarios)
+);
+
+CREATE TABLE Peticion_Sitios (
+    id_peticion INT NOT NULL,
+    id_sitios INT NOT NULL,
+    FOREIGN KEY (id_peticion) REFERENCES Peticion (id_peticion),
+    FOREIGN KEY (id_sitios) REFERENCES Sitios (id)
+);
+
+CREATE TABLE Peticion_IP (
+    id_ip INT NOT NULL,
+    id_peticion INT NOT NULL,
+    FOREIGN KEY (id_ip) REFERENCES IP (id_ip),
+    FOREIGN KEY (id_peticion) REFERENCES Peticion (id_peticion)
+);
@@ -0,0 +1,246 @@
+"""
+Prueba de carga del envío de Form.py sin tocar producción: MySQL local (temporal o uno de
+pruebas existente) y un stub de la API de Notion con latencia y errores configurables.
+
+    python -m bench.formulario --usuarios 8 --envios 200
+    python -m bench.formulario --mysql-existente --latencia-notion 500 --errores-notion 0.05
+
+Cada usuario simulado envía el formulario (mostrar_resumen) y después pide la tabla de espera
+y el contador, como hace el navegador. Se reporta el rendimiento, los percentiles de latencia
+por callback, las sentencias SQL por envío y el estado de la cola de Notion.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+from bench.medir import RAIZ, _percentiles
+from bench.mysql_local import MySQLLocal, ejecutar_sql
+from bench.notion_stub import StubNotion
+
+BASE_DATOS = "form_bench"
+PETICIONES_SIN_FECHAS = ["Audiencia", "Competencia", "Benchmark", "Comscore"]
+
+
+def preparar_base(configuracion, form, pendientes=0, usuarios=50, semilla=0):
+    """Crea la base desde cero (esquema + migraciones), los catálogos y una cola inicial."""
+    conn = mysql.connector.connect(**configuracion)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BASE_DATOS}")
+    cursor.execute(f"CREATE DATABASE {BASE_DATOS} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+    cursor.execute(f"USE {BASE_DATOS}")
+
+    with open(os.path.join(RAIZ, "bench", "esquema_form.sql"), encoding="utf-8") as f:
+        ejecutar_sql(cursor, f.read())
+    for migracion in sorted(glob.glob(os.path.join(RAIZ, "migraciones", "*.sql"))):
+        with open(migracion, encoding="utf-8") as f:
+            ejecutar_sql(cursor, f.read())
+
+    cursor.executemany("INSERT INTO Tipo_peticion (nombre_peticion) VALUES (%s)",
+                       [(t,) for t in form.tipos_peticion])
+    cursor.executemany("INSERT INTO IP (nombre_ip) VALUES (%s)", [(ip,) for ip in form.IPs])
+    for vertical, sitios in form.sitios_por_vertical.items():
+        cursor.execute("INSERT INTO Verticales (nombre_vertical) VALUES (%s)", (vertical,))
+        cursor.executemany("INSERT INTO Sitios (nombre_sitio, id_vertical) VALUES (%s, %s)",
+                           [(sitio, cursor.lastrowid) for sitio in sitios])
+
+    # Cola inicial para que la tabla y el contador trabajen sobre algo realista
+    rng = random.Random(semilla)
+    for i in range(usuarios):
+        cursor.execute("INSERT INTO Usuarios_unicos (nombre_usuarios_unicos) VALUES (%s)", (f"previo{i}@bench.local",))
+        cursor.execute("INSERT INTO Usuarios (id_usuarios_unicos, nombre_usuarios) VALUES (%s, %s)",
+                       (cursor.lastrowid, f"previo{i}@bench.local"))
+    inicio = datetime.now() - timedelta(days=60)
+    cursor.executemany(
+        "INSERT INTO Peticion (id_tipo_peticion, id_usuarios, `Descripción`, `fecha_petición`, `estado_petición`) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        [(rng.randint(1, len(form.tipos_peticion)), rng.randint(1, usuarios), "Petición previa",
+          inicio + timedelta(minutes=i), rng.choice([None, "En curso", "Finalizada"]))
+         for i in range(pendientes)],
+    )
+    cursor.execute("SELECT id_peticion FROM Peticion")
+    ids = [fila[0] for fila in cursor.fetchall()]
+    n_sitios = sum(len(s) for s in form.sitios_por_vertical.values())
+    cursor.executemany("INSERT INTO Peticion_Sitios (id_peticion, id_sitios) VALUES (%s, %s)",
+                       [(i, rng.randint(1, n_sitios)) for i in ids])
+    cursor.executemany("INSERT INTO Peticion_IP (id_ip, id_peticion) VALUES (%s, %s)",
+                       [(rng.randint(1, len(form.IPs)), i) for i in ids])
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def sentencias_servidor(configuracion):
+    """Contador global `Questions` del servidor (sentencias recibidas de todos los clientes)."""
+    conn = mysql.connector.connect(**configuracion)
+    cursor = conn.cursor()
+    cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+    valor = int(cursor.fetchone()[1])
+    cursor.close()
+    conn.close()
+    return valor
+
+
+def _salida(outputs):
+    if len(outputs) == 1:
+        return f"{outputs[0]['id']}.{outputs[0]['property']}"
+    return ".." + "...".join(f"{o['id']}.{o['property']}" for o in outputs) + ".."
+
+
+def _callback(cliente, outputs, inputs, state=()):
+    """Llama a un callback como el navegador (POST /_dash-update-component); devuelve (respuesta, segundos)."""
+    cuerpo = {
+        "output": _salida(outputs),
+        "outputs": outputs if len(outputs) > 1 else outputs[0],
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "state": [{"id": i, "property": p, "value": v} for i, p, v in state],
+        "changedPropIds": [f"{inputs[0][0]}.{inputs[0][1]}"],
+    }
+    inicio = time.perf_counter()
+    respuesta = cliente.post("/_dash-update-component", json=cuerpo)
+    segundos = time.perf_counter() - inicio
+    if respuesta.status_code not in (200, 204):
+        raise RuntimeError(f"{cuerpo['output']}: HTTP {respuesta.status_code} {respuesta.data[:200]!r}")
+    return (respuesta.json if respuesta.status_code == 200 else None), segundos
+
+
+def enviar(cliente, form, rng, n):
+    """Un envío completo: formulario y después tabla de espera y contador. Devuelve las latencias."""
+    vertical = rng.choice(list(form.sitios_por_vertical))
+    sitios = rng.sample(form.sitios_por_vertical[vertical], rng.randint(1, len(form.sitios_por_vertical[vertical])))
+    salida, t_resumen = _callback(
+        cliente,
+        [{"id": "output-resumen", "property": "children"}, {"id": "id-peticion-enviada", "property": "data"}],
+        [("boton-enviar", "n_clicks", 1)],
+        [("email", "value", f"usuario{n % 200}@bench.local"),
+         ("dropdown-peticion", "value", rng.choice(PETICIONES_SIN_FECHAS)),
+         ("dropdown-vertical", "value", [vertical]),
+         ("dropdown-sitio", "value", sitios),
+         ("dropdown-ip", "value", ["México"]),
+         ("input-descripcion", "value", f"Envío de prueba {n}"),
+         ("input-fecha-inicio", "value", None), ("input-fecha-fin", "value", None),
+         ("my-date-picker-range", "start_date", None), ("my-date-picker-range", "end_date", None)],
+    )
+    id_peticion = salida["response"]["id-peticion-enviada"]["data"]
+    resumen = salida["response"]["output-resumen"]["children"]
+
+    _, t_tabla = _callback(
+        cliente,
+        [{"id": "tabla-peticiones", "property": "data"}, {"id": "tabla-peticiones", "property": "page_count"},
+         {"id": "contenedor-tabla-espera", "property": "hidden"}, {"id": "tabla-espera", "property": "children"}],
+        [("output-resumen", "children", resumen), ("tabla-peticiones", "page_current", 0),
+         ("tabla-peticiones", "page_size", form.TAMANO_PAGINA), ("tabla-peticiones", "sort_by", []),
+         ("tabla-peticiones", "filter_query", "")],
+        [("boton-enviar", "n_clicks", 1)],
+    )
+    _, t_contador = _callback(
+        cliente,
+        [{"id": "contador-finalizadas", "property": "children"}],
+        [("id-peticion-enviada", "data", id_peticion)],
+        [("boton-enviar", "n_clicks", 1)],
+    )
+    return {"resumen": t_resumen, "tabla": t_tabla, "contador": t_contador,
+            "total": t_resumen + t_tabla + t_contador, "ok": id_peticion is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=8, help="usuarios simultáneos")
+    parser.add_argument("--envios", type=int, default=200, help="envíos en total")
+    parser.add_argument("--pendientes", type=int, default=2000, help="peticiones previas en la base")
+    parser.add_argument("--latencia-notion", type=float, default=300, help="ms por petición al stub")
+    parser.add_argument("--errores-notion", type=float, default=0.0, help="proporción de 500 del stub")
+    parser.add_argument("--limite-notion", type=float, default=0.0, help="proporción de 429 del stub")
+    parser.add_argument("--espera-notion", type=float, default=30, help="segundos para vaciar la cola al final")
+    parser.add_argument("--mysql-existente", action="store_true",
+                        help="usar el servidor de DB_HOST/DB_PORT/DB_USER/DB_PASSWORD (se crea la base form_bench)")
+    parser.add_argument("--puerto-mysql", type=int, default=3399)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="guarda el reporte en JSON")
+    args = parser.parse_args()
+
+    servidor = None
+    if args.mysql_existente:
+        configuracion = {"host": os.getenv("DB_HOST", "127.0.0.1"), "port": int(os.getenv("DB_PORT", "3306")),
+                         "user": os.getenv("DB_USER", "root"), "password": os.getenv("DB_PASSWORD", "")}
+    else:
+        servidor = MySQLLocal(args.puerto_mysql)
+        configuracion = servidor.iniciar()
+    stub = StubNotion(latencia_ms=args.latencia_notion, variacion_ms=args.latencia_notion / 3,
+                      errores=args.errores_notion, limite=args.limite_notion, semilla=args.semilla).iniciar()
+    temporal = tempfile.mkdtemp(prefix="form_bench_")
+
+    try:
+        # Form.py y sus módulos leen la configuración del entorno al importarse
+        os.environ.update({
+            "DB_HOST": configuracion["host"], "DB_PORT": str(configuracion["port"]),
+            "DB_USER": configuracion["user"], "DB_PASSWORD": configuracion["password"], "DB_NAME": BASE_DATOS,
+            "NOTION_API_URL": stub.url, "NOTION_TOKEN": "bench", "DATABASE_ID": "bench",
+            "NOTION_OUTBOX": os.path.join(temporal, "outbox.sqlite3"),
+            "COLA_MARCA": os.path.join(temporal, "cola.version"),
+        })
+        sys.path.insert(0, RAIZ)
+        import Conexion
+        import Form
+
+        preparar_base(configuracion, Form, args.pendientes, semilla=args.semilla)
+        Form.app.server.test_client().get("/")  # prepara la app antes de medir
+
+        locales = threading.local()
+
+        def tarea(n):
+            if not hasattr(locales, "cliente"):
+                locales.cliente = Form.app.server.test_client()
+                locales.rng = random.Random(args.semilla * 1000 + n)
+            return enviar(locales.cliente, Form, locales.rng, n)
+
+        sentencias_antes = sentencias_servidor(configuracion)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(args.usuarios) as ejecutor:
+            resultados = list(ejecutor.map(tarea, range(args.envios)))
+        duracion = time.perf_counter() - inicio
+        # Se restan las dos consultas de estado del propio reporte
+        sentencias = sentencias_servidor(configuracion) - sentencias_antes - 2
+
+        # Espera a que el hilo de la outbox termine de enviar a Notion
+        from Notion import obtener_outbox
+        limite = time.monotonic() + args.espera_notion
+        while time.monotonic() < limite and set(obtener_outbox().estado()) - {"enviado", "muerto"}:
+            time.sleep(0.5)
+
+        reporte = {
+            "envios": args.envios,
+            "usuarios": args.usuarios,
+            "envios_ok": sum(r["ok"] for r in resultados),
+            "duracion_s": duracion,
+            "envios_por_segundo": args.envios / duracion,
+            **{f"latencia_{nombre}": _percentiles([r[nombre] for r in resultados])
+               for nombre in ["resumen", "tabla", "contador", "total"]},
+            "sentencias_sql_por_envio": sentencias / args.envios,
+            # Préstamos de los tres callbacks (envío, tabla y contador): todos corren en este proceso
+            "pool_mysql": Conexion.pool.estadisticas(),
+            "outbox_notion": obtener_outbox().estado(),
+            "respuestas_stub_notion": stub.respuestas,
+        }
+    finally:
+        stub.detener()
+        if servidor is not None:
+            servidor.detener()
+
+    print(json.dumps(reporte, indent=2, default=str))
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Generador de datos sintéticos con el esquema y las distribuciones de DATA/Examen.xlsx."""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from Datos import COLUMNAS, HOJA, cargar_dataset
+
+DIRECTORIO = os.path.join(os.path.dirname(__file__), "datos")
+
+# Límite de filas de una hoja de Excel; por encima solo se genera el archivo columnar
+MAX_FILAS_EXCEL = 1_048_575
+
+
+def _frecuencias(serie):
+    # Categorías en orden alfabético, igual que las que produce Datos.compactar
+    frecuencias = serie.value_counts(normalize=True).sort_index()
+    return frecuencias.index.astype(str), frecuencias.to_numpy()
+
+
+def _categoria(codigos, categorias):
+    # Se construye directamente la categoría (códigos + diccionario) para no materializar textos
+    return pd.Categorical.from_codes(codigos, categories=categorias)
+
+
+def _muestrear(rng, serie, n):
+    categorias, probabilidades = _frecuencias(serie)
+    return _categoria(rng.choice(len(categorias), size=n, p=probabilidades), categorias)
+
+
+def _habitual(rng, serie, clientes, filas, probabilidad):
+    """Valor habitual de cada cliente con `probabilidad`; el resto de vistas, al azar."""
+    categorias, probabilidades = _frecuencias(serie)
+    habitual = rng.choice(len(categorias), size=clientes.max() + 1, p=probabilidades)
+    azar = rng.choice(len(categorias), size=filas, p=probabilidades)
+    codigos = np.where(rng.random(filas) < probabilidad, habitual[clientes], azar)
+    return _categoria(codigos, categorias)
+
+
+def generar(escala: int, semilla: int = 0, base: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Dataset `escala` veces más grande que el libro de ejemplo, ya en la forma de `Datos.compactar`.
+
+    REGION, GENRE, DEVICE, TITLE y SCREENTIME se muestrean con las frecuencias del libro. Los
+    clientes crecen con la escala (con un conjunto de 2 IDs por fila, ~0.8 clientes distintos
+    por fila, como en el libro) y cada uno concentra sus vistas en una región y un dispositivo
+    habituales.
+    """
+    base = cargar_dataset() if base is None else base
+    rng = np.random.default_rng(semilla)
+    filas = len(base) * escala
+    clientes = rng.integers(0, 2 * filas, size=filas)
+    ids, codigos_cliente = np.unique(clientes, return_inverse=True)
+
+    screentime, probabilidades = base["SCREENTIME"].value_counts(normalize=True).pipe(
+        lambda f: (f.index.to_numpy(), f.to_numpy()))
+    fechas = pd.date_range(base["DATE"].min(), base["DATE"].max(), freq="D").to_numpy()
+    df = pd.DataFrame({
+        "DATE": rng.choice(fechas, size=filas),
+        "CUSTOMER_ID": _categoria(codigos_cliente, pd.Index(ids.astype(str))),
+        "REGION": _habitual(rng, base["REGION"], codigos_cliente, filas, 0.9),
+        "DEVICE": _habitual(rng, base["DEVICE"], codigos_cliente, filas, 0.95),
+        "TITLE": _muestrear(rng, base["TITLE"], filas),
+        "GENRE": _muestrear(rng, base["GENRE"], filas),
+        "SCREENTIME": rng.choice(screentime, size=filas, p=probabilidades).astype(base["SCREENTIME"].dtype),
+    })
+    return df[COLUMNAS]
+
+
+def guardar(df: pd.DataFrame, escala: int, excel: bool = False, directorio: str = DIRECTORIO) -> dict:
+    """Guarda el dataset como Arrow IPC (y opcionalmente como libro de Excel); devuelve las rutas."""
+    os.makedirs(directorio, exist_ok=True)
+    rutas = {"columnar": os.path.join(directorio, f"sintetico_{escala}x.feather")}
+    df.to_feather(rutas["columnar"], compression="uncompressed")
+
+    if excel:
+        if len(df) > MAX_FILAS_EXCEL:
+            print(f"Escala {escala}x: {len(df)} filas no caben en una hoja de Excel; solo se genera el archivo columnar")
+        else:
+            rutas["excel"] = os.path.join(directorio, f"sintetico_{escala}x.xlsx")
+            df.to_excel(rutas["excel"], sheet_name=HOJA, index=False)
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escala", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--excel", action="store_true", help="también escribe el libro de Excel (lento)")
+    args = parser.parse_args()
+
+    base = cargar_dataset()
+    for escala in args.escala:
+        rutas = guardar(generar(escala, args.semilla, base), escala, args.excel)
+        print(f"Escala {escala}x:", ", ".join(rutas.values()))
+
+
+if __name__ == "__main__":
+    main()
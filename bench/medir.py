@@ -0,0 +1,135 @@
+"""
+Mide un dataset en un proceso propio: tiempo de carga, latencia del callback de Dashboard.py
+(percentiles, con y sin caché), bytes de las figuras, RSS máximo y, opcionalmente, el tiempo
+de ejecución de DB.py con Streamlit.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentiles(tiempos):
+    ms = np.array(tiempos) * 1000
+    return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99))}
+
+
+def _selecciones(dashboard, n, semilla):
+    """Selecciones de regiones al azar (vacía = todas) y, en una de cada cinco, filtros extra."""
+    rng = random.Random(semilla)
+    regiones = list(dashboard.cubo.regiones)
+    generos = list(dashboard.df["GENRE"].cat.categories)
+    dispositivos = list(dashboard.df["DEVICE"].cat.categories)
+    fechas = sorted(dashboard.df["DATE"].dt.strftime("%Y-%m-%d").unique())
+    selecciones = []
+    for _ in range(n):
+        seleccion = [rng.sample(regiones, rng.randint(0, min(5, len(regiones))))]
+        if rng.random() < 0.2:
+            inicio = rng.randrange(len(fechas))
+            seleccion += [rng.sample(generos, 2), rng.sample(dispositivos, 1),
+                          fechas[inicio], fechas[rng.randrange(inicio, len(fechas))]]
+        selecciones.append(seleccion)
+    return selecciones
+
+
+def _medir_excel(ruta_excel):
+    # Conversión en frío: se borra la copia columnar para forzar la lectura del Excel
+    from Datos import HOJA, _rutas_cache, cargar_dataset
+    for ruta in _rutas_cache(ruta_excel, HOJA):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    inicio = time.perf_counter()
+    cargar_dataset(ruta_excel)
+    frio = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    cargar_dataset(ruta_excel)
+    return {"excel_frio_s": frio, "excel_caliente_s": time.perf_counter() - inicio}
+
+
+def medir(dataset: str, repeticiones: int = 100, semilla: int = 0, streamlit: bool = False) -> dict:
+    # Dashboard y DB.py leen el dataset de la variable DATASET, que Datos lee al importarse: si
+    # Datos ya se importó con otro valor, la comprobación de filas de abajo lo detecta
+    os.environ["DATASET"] = dataset
+    from Cache import serializar
+    from Datos import cargar_dataset
+    from Figuras import tamano_payload
+
+    resultado = {"dataset": dataset}
+    inicio = time.perf_counter()
+    df = cargar_dataset(dataset)
+    resultado["carga_s"] = time.perf_counter() - inicio
+    resultado["filas"] = len(df)
+
+    inicio = time.perf_counter()
+    import Dashboard
+    resultado["arranque_dashboard_s"] = time.perf_counter() - inicio
+    if len(Dashboard.df) != resultado["filas"]:
+        raise RuntimeError(f"Dashboard cargó {len(Dashboard.df)} filas en lugar de las {resultado['filas']} "
+                           f"de {dataset}; ¿se importó Datos antes de fijar DATASET?")
+
+    selecciones = _selecciones(Dashboard, repeticiones, semilla)
+    Dashboard.construir_dashboard([])  # calentamiento (plantillas de Plotly, etc.)
+
+    tiempos, bytes_respuesta = [], []
+    for seleccion in selecciones:
+        inicio = time.perf_counter()
+        Dashboard.cache_figuras.limpiar()
+        bundle = Dashboard.update_dashboard(*seleccion)
+        tiempos.append(time.perf_counter() - inicio)
+        bytes_respuesta.append(len(serializar(bundle)))
+    resultado["callback_sin_cache"] = _percentiles(tiempos)
+
+    tiempos = []
+    for seleccion in selecciones:
+        Dashboard.update_dashboard(*seleccion)
+        inicio = time.perf_counter()
+        Dashboard.update_dashboard(*seleccion)
+        tiempos.append(time.perf_counter() - inicio)
+    resultado["callback_con_cache"] = _percentiles(tiempos)
+
+    figuras = Dashboard.construir_dashboard([])[:7]
+    resultado["bytes_figuras_todas_regiones"] = sum(tamano_payload(fig) for fig in figuras)
+    resultado["bytes_respuesta_media"] = float(np.mean(bytes_respuesta))
+
+    if streamlit:
+        from streamlit.testing.v1 import AppTest
+        app = AppTest.from_file(os.path.join(RAIZ, "DB.py"), default_timeout=600)
+        inicio = time.perf_counter()
+        app.run()
+        resultado["db_streamlit_primera_s"] = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        app.run()
+        resultado["db_streamlit_rerun_s"] = time.perf_counter() - inicio
+
+    # ru_maxrss está en KB en Linux
+    resultado["rss_max_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dataset", required=True, help="archivo .feather o .xlsx")
+    parser.add_argument("--repeticiones", type=int, default=100)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--streamlit", action="store_true", help="también mide DB.py con Streamlit")
+    parser.add_argument("--excel", help="libro de Excel equivalente para medir la conversión en frío")
+    args = parser.parse_args()
+
+    # Antes de cualquier import de Datos (también el de _medir_excel), que fija su ruta al importarse
+    os.environ["DATASET"] = args.dataset
+    resultado = {}
+    if args.excel:
+        resultado.update(_medir_excel(args.excel))
+    resultado.update(medir(args.dataset, args.repeticiones, args.semilla, args.streamlit))
+    print(json.dumps(resultado))
+
+
+if __name__ == "__main__":
+    main()
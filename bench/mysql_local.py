@@ -0,0 +1,76 @@
+"""Servidor MySQL temporal para las pruebas de carga, en un directorio desechable."""
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import mysql.connector
+
+
+def ejecutar_sql(cursor, texto: str):
+    """Ejecuta un archivo SQL sentencia por sentencia (sin comentarios `--`)."""
+    lineas = [linea for linea in texto.splitlines() if not linea.strip().startswith("--")]
+    for sentencia in "\n".join(lineas).split(";"):
+        if sentencia.strip():
+            cursor.execute(sentencia)
+
+
+class MySQLLocal:
+    """
+    Inicializa y arranca `mysqld` con un directorio de datos temporal, escuchando solo en
+    127.0.0.1, con root sin contraseña. `detener` lo apaga y borra el directorio.
+    """
+
+    def __init__(self, puerto: int = 3399, binario: str = None):
+        self.puerto = puerto
+        self.binario = binario or shutil.which("mysqld")
+        self.directorio = None
+        self.proceso = None
+
+    @property
+    def configuracion(self) -> dict:
+        return {"host": "127.0.0.1", "port": self.puerto, "user": "root", "password": ""}
+
+    def iniciar(self, espera_max: float = 60.0) -> dict:
+        if not self.binario:
+            raise RuntimeError("No se encontró mysqld; instala MySQL 8 o usa un servidor existente (--mysql-existente)")
+
+        self.directorio = tempfile.mkdtemp(prefix="form_bench_")
+        datos = os.path.join(self.directorio, "datos")
+        base = [self.binario, "--no-defaults", f"--datadir={datos}"]
+        # mysqld se niega a correr como root salvo que se pida explícitamente
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            base.append("--user=root")
+        registro = open(os.path.join(self.directorio, "mysqld.log"), "w")
+        subprocess.run([*base, "--initialize-insecure"], check=True, stdout=registro, stderr=registro)
+        self.proceso = subprocess.Popen(
+            [*base, f"--port={self.puerto}", "--bind-address=127.0.0.1", "--mysqlx=OFF", "--skip-log-bin",
+             f"--socket={os.path.join(self.directorio, 'mysqld.sock')}",
+             f"--pid-file={os.path.join(self.directorio, 'mysqld.pid')}"],
+            stdout=registro, stderr=registro,
+        )
+
+        limite = time.monotonic() + espera_max
+        while True:
+            try:
+                mysql.connector.connect(**self.configuracion).close()
+                return self.configuracion
+            except mysql.connector.Error:
+                if self.proceso.poll() is not None or time.monotonic() > limite:
+                    # Se conserva el directorio para poder leer el registro
+                    self.detener(borrar=False)
+                    raise RuntimeError(f"mysqld no arrancó; ver {registro.name}")
+                time.sleep(0.5)
+
+    def detener(self, borrar: bool = True):
+        if self.proceso is not None and self.proceso.poll() is None:
+            self.proceso.terminate()
+            try:
+                self.proceso.wait(30)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+        self.proceso = None
+        if borrar and self.directorio:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+            self.directorio = None
@@ -0,0 +1,119 @@
+"""
+Servidor HTTP local que imita `POST /v1/pages` de Notion, con latencia y errores configurables.
+
+    python -m bench.notion_stub --puerto 8099 --latencia 300 --errores 0.05 --limite 0.02
+
+Apuntar la aplicación a él con NOTION_API_URL=http://127.0.0.1:8099/v1.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubNotion:
+    """
+    Stub de la API de páginas de Notion en un hilo propio.
+
+    Cada petición espera `latencia_ms` (± `variacion_ms`) y responde 500 con probabilidad
+    `errores`, 429 con Retry-After con probabilidad `limite` y 200 en el resto. Lleva la cuenta
+    de respuestas por código y guarda las páginas creadas.
+    """
+
+    def __init__(self, puerto: int = 0, latencia_ms: float = 0, variacion_ms: float = 0,
+                 errores: float = 0.0, limite: float = 0.0, semilla: int = 0):
+        self.latencia_ms = latencia_ms
+        self.variacion_ms = variacion_ms
+        self.errores = errores
+        self.limite = limite
+        self.respuestas = {}
+        self.paginas = []
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", puerto), self._manejador())
+        self.servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_port}/v1"
+
+    def _manejador(self):
+        stub = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                codigo, encabezados, respuesta = stub._responder(self.path, cuerpo)
+                datos = json.dumps(respuesta).encode("utf-8")
+                self.send_response(codigo)
+                for nombre, valor in encabezados.items():
+                    self.send_header(nombre, valor)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
+
+    def _responder(self, ruta, cuerpo):
+        with self._lock:
+            sorteo = self._rng.random()
+            espera = max(0.0, self.latencia_ms + self._rng.uniform(-1, 1) * self.variacion_ms) / 1000
+        time.sleep(espera)
+
+        if ruta.rstrip("/") != "/v1/pages":
+            codigo, encabezados, respuesta = 404, {}, {"object": "error", "code": "invalid_request_url"}
+        elif sorteo < self.errores:
+            codigo, encabezados, respuesta = 500, {}, {"object": "error", "code": "internal_server_error"}
+        elif sorteo < self.errores + self.limite:
+            codigo, encabezados, respuesta = 429, {"Retry-After": "1"}, {"object": "error", "code": "rate_limited"}
+        else:
+            pagina = {"object": "page", "id": str(uuid.uuid4()), **json.loads(cuerpo or b"{}")}
+            codigo, encabezados, respuesta = 200, {}, pagina
+            with self._lock:
+                self.paginas.append(pagina)
+
+        with self._lock:
+            self.respuestas[codigo] = self.respuestas.get(codigo, 0) + 1
+        return codigo, encabezados, respuesta
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, name="stub-notion", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--puerto", type=int, default=8099)
+    parser.add_argument("--latencia", type=float, default=300, help="milisegundos por petición")
+    parser.add_argument("--variacion", type=float, default=100, help="± milisegundos al azar")
+    parser.add_argument("--errores", type=float, default=0.0, help="proporción de respuestas 500")
+    parser.add_argument("--limite", type=float, default=0.0, help="proporción de respuestas 429")
+    args = parser.parse_args()
+
+    stub = StubNotion(args.puerto, args.latencia, args.variacion, args.errores, args.limite)
+    print("Stub de Notion en", stub.url)
+    try:
+        stub.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(stub.respuestas)
+
+
+if __name__ == "__main__":
+    main()
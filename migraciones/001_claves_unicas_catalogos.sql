@@ -0,0 +1,20 @@
+-- Claves únicas de los catálogos que usa Form.py.
+--
+-- Los upserts de usuarios (INSERT ... ON DUPLICATE KEY UPDATE) dependen de ellas, y además
+-- evitan que dos envíos simultáneos dupliquen un nombre. Si alguna tabla ya tiene nombres
+-- repetidos hay que depurarlos antes de aplicar esta migración.
+
+ALTER TABLE Tipo_peticion
+    ADD UNIQUE KEY uq_tipo_peticion_nombre (nombre_peticion);
+
+ALTER TABLE Sitios
+    ADD UNIQUE KEY uq_sitios_nombre (nombre_sitio);
+
+ALTER TABLE IP
+    ADD UNIQUE KEY uq_ip_nombre (nombre_ip);
+
+ALTER TABLE Usuarios_unicos
+    ADD UNIQUE KEY uq_usuarios_unicos_nombre (nombre_usuarios_unicos);
+
+ALTER TABLE Usuarios
+    ADD UNIQUE KEY uq_usuarios_unico (id_usuarios_unicos);
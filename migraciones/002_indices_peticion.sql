@@ -0,0 +1,9 @@
+-- Índices para las consultas de peticiones pendientes (tabla de espera y contador).
+--
+-- El filtro por estado (NULL o distinto de 'Finalizada') se resuelve como rangos sobre
+-- estado_petición y, dentro de cada estado, las filas ya salen ordenadas por fecha. El índice
+-- solo por fecha sirve a los listados ordenados por fecha sin filtro de estado.
+
+CREATE INDEX idx_peticion_estado_fecha ON Peticion (estado_petición, fecha_petición);
+
+CREATE INDEX idx_peticion_fecha ON Peticion (fecha_petición);
@@ -0,0 +1,21 @@
+-- Folio de cada petición y cursor de la sincronización de estados desde Notion.
+--
+-- Obligatoria antes de desplegar Form.py, Importar.py y Sincronizacion.py: el formulario
+-- inserta el folio en cada petición.
+--
+-- El folio (UUID) se genera al enviar el formulario y se guarda en MySQL. Si la base de Notion
+-- tiene una propiedad de texto para él y se configura NOTION_PROPIEDAD_FOLIO con su nombre,
+-- también se envía en cada página y Sincronizacion.py encuentra la fila de la página sin
+-- comparar textos. Sin esa propiedad, y para las peticiones anteriores (folio NULL), las páginas
+-- se emparejan por correo y fecha de la petición.
+
+ALTER TABLE Peticion
+    ADD COLUMN folio CHAR(36) NULL,
+    ADD UNIQUE KEY uq_peticion_folio (folio);
+
+-- Último last_edited_time de Notion ya aplicado, por origen
+CREATE TABLE Sincronizacion (
+    origen VARCHAR(50) PRIMARY KEY,
+    ultimo_cambio VARCHAR(40) NOT NULL,
+    actualizado DATETIME NOT NULL
+);
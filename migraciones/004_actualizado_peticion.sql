@@ -0,0 +1,12 @@
+-- Momento del último cambio de cada petición, para que el índice de la cola (Cola.IndiceCola)
+-- aplique solo las filas insertadas o cambiadas desde su última lectura en lugar de volver a
+-- cargar todas las pendientes.
+--
+-- MySQL lo actualiza solo en cada INSERT y en cada UPDATE que cambia la fila, sin tocar las
+-- consultas de Form.py, Sincronizacion.py ni Importar.py. Las filas existentes quedan con el
+-- momento de la migración.
+
+ALTER TABLE Peticion
+    ADD COLUMN actualizado TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+        ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_peticion_actualizado (actualizado);
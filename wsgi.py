@@ -0,0 +1,73 @@
+"""
+Punto de entrada WSGI para gunicorn: el dashboard y el formulario en un mismo servidor.
+
+    gunicorn --preload --worker-class gthread --threads 8 wsgi:server
+
+Los callbacks de Form.py esperan a MySQL y a la cola de Notion; con hilos (gthread) un envío
+lento ocupa un hilo del worker y no el worker entero, y todos los hilos comparten el pool de
+conexiones del proceso.
+
+El dashboard queda en /dashboard/ y el formulario en /form/ (DASHBOARD_PREFIJO y
+FORM_PREFIJO); / redirige al dashboard y /arranque devuelve cuánto tardó cada fase del
+arranque, que también se registra en el log.
+
+Con --preload el dataset se carga (mapeado en memoria) y el cubo y los sketches se construyen
+una sola vez en el proceso maestro antes de crear los workers. Los workers heredan esas
+estructuras por fork y comparten las páginas del archivo Arrow, así que añadir workers no
+multiplica la memoria del dataset. Los catálogos de Form.py (Catalogos.py) también se cargan en
+el maestro, con una conexión que se cierra antes del fork; el resto del pool y el envío a Notion
+arrancan en cada worker con la primera petición.
+"""
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from flask import Flask, jsonify, redirect
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+inicio = time.perf_counter()
+load_dotenv()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"),
+                    format="%(asctime)s [%(process)d] %(name)s %(levelname)s: %(message)s")
+
+PREFIJO_DASHBOARD = os.getenv("DASHBOARD_PREFIJO", "/dashboard/")
+PREFIJO_FORM = os.getenv("FORM_PREFIJO", "/form/")
+# Cada app arma sus URLs con su prefijo al importarse; por separado (python Dashboard.py) usan /
+os.environ["DASHBOARD_PREFIJO"] = PREFIJO_DASHBOARD
+os.environ["FORM_PREFIJO"] = PREFIJO_FORM
+
+from Arranque import FASES, fase  # noqa: E402
+
+with fase("Dashboard"):
+    import Dashboard  # noqa: E402
+with fase("Form"):
+    import Form  # noqa: E402
+with fase("Catálogos"):
+    from Catalogos import cargar_catalogos  # noqa: E402
+    from Conexion import pool  # noqa: E402
+
+    cargar_catalogos()
+    pool.cerrar_inactivas()
+
+raiz = Flask(__name__)
+
+
+@raiz.route("/")
+def inicio_sitio():
+    return redirect(PREFIJO_DASHBOARD)
+
+
+@raiz.route("/arranque")
+def fases_arranque():
+    return jsonify({"fases": [{"fase": nombre, "segundos": round(segundos, 3)} for nombre, segundos in FASES],
+                    "total_s": round(ARRANQUE_S, 3)})
+
+
+server = DispatcherMiddleware(raiz, {
+    PREFIJO_DASHBOARD.rstrip("/"): Dashboard.app.server,
+    PREFIJO_FORM.rstrip("/"): Form.app.server,
+})
+
+ARRANQUE_S = time.perf_counter() - inicio
+logging.getLogger("arranque").info("Arranque completo en %.3f s", ARRANQUE_S)